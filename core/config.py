@@ -36,6 +36,19 @@ class Settings(BaseSettings):
         description="Base URL for Winner proxy API"
     )
 
+    # ---- Background jobs ----
+    JOB_WORKERS: int = Field(default=2, description="Max concurrent build/rank/render jobs")
+    JOB_HISTORY: int = Field(default=200, description="Finished job records kept in memory")
+    REFRESH_CRON: str = Field(
+        default="0 4 * * *",
+        description="Crontab for the periodic ingest refresh (empty disables it)"
+    )
+
+    # ---- HTTP response cache ----
+    RESPONSE_CACHE_MAX_BYTES: int = Field(default=128 * 1024 * 1024, description="Memory budget for cached GET responses (0 disables)")
+    RESPONSE_CACHE_MAX_AGE: int = Field(default=30, description="Cache-Control max-age (seconds) on cached routes")
+    RESPONSE_CACHE_VERSION_TTL: float = Field(default=2.0, description="Seconds a data/ fingerprint is reused before re-stating files")
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -0,0 +1,30 @@
+import logging
+from collections import defaultdict
+from typing import Any, Callable, DefaultDict, Dict, List
+
+log = logging.getLogger(__name__)
+
+# ---- Topics ----
+TEAM_DATA_CHANGED = "team_data_changed"  # payload: {"league", "season", "teams": [...]}
+
+Handler = Callable[[Dict[str, Any]], None]
+_subscribers: DefaultDict[str, List[Handler]] = defaultdict(list)
+
+
+def subscribe(topic: str, handler: Handler) -> None:
+    if handler not in _subscribers[topic]:
+        _subscribers[topic].append(handler)
+
+
+def unsubscribe(topic: str, handler: Handler) -> None:
+    if handler in _subscribers[topic]:
+        _subscribers[topic].remove(handler)
+
+
+def publish(topic: str, payload: Dict[str, Any]) -> None:
+    """Call every handler for topic in-process; a failing handler never breaks the publisher."""
+    for handler in list(_subscribers[topic]):
+        try:
+            handler(payload)
+        except Exception:
+            log.exception("event handler failed for %s", topic)
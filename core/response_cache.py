@@ -0,0 +1,315 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import anyio
+
+from core import events
+from core.config import settings
+from utils.serialization_utils import accepts_ndjson
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+# GET routes whose responses only change when files under data/ change
+CACHED_PREFIXES = ("/api/v2/leagues", "/api/v2/league/", "/api/v2/team/", "/api/v2/mental/", "/api/v2/players/")
+UNCACHED_PATHS = {"/api/v2/mental/best-xi/stats", "/api/v2/players/build/summary"}
+DATA_DIRS = (Path("data/players"), Path("data/league_init"), Path("data/renders"))
+
+COMPRESS_MIN_BYTES = 1000  # same floor as the GZipMiddleware for uncached routes
+BROTLI_QUALITY = 9  # paid once per cached entry, not per request
+GZIP_LEVEL = 9
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+Key = Tuple[str, str, str]  # (path, normalized query, data version)
+Headers = List[Tuple[bytes, bytes]]
+
+
+def data_fingerprint(dirs=DATA_DIRS) -> str:
+    """Fingerprint (path, size, mtime) of every file the cached routes read."""
+    h = hashlib.sha1()
+    for root in dirs:
+        if not root.exists():
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                st = os.stat(os.path.join(dirpath, name))
+                h.update(f"{dirpath}/{name}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def is_cacheable(method: str, path: str) -> bool:
+    return method == "GET" and path.startswith(CACHED_PREFIXES) and path not in UNCACHED_PATHS
+
+
+def normalized_query(query_string: bytes) -> str:
+    """Query string with parameters sorted, so ?a=1&b=2 and ?b=2&a=1 share an entry."""
+    return urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" matches "x"; * matches anything."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: str, size: int) -> str:
+    """Best of br/gzip the client accepts (by q-value, br first on ties); identity for small bodies."""
+    if size < COMPRESS_MIN_BYTES or not accept_encoding:
+        return "identity"
+    q: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        q[coding.strip().lower()] = weight
+    star = q.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for coding in ENCODINGS:
+        weight = q.get(coding, star)
+        if weight > best_q:
+            best, best_q = coding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+@dataclass
+class CachedResponse:
+    headers: Headers  # response headers minus content-length / content-encoding
+    body: bytes
+    etag: str  # of the identity body; encoded variants append "-<encoding>"
+    variants: Dict[str, bytes] = field(default_factory=dict)  # encoding -> compressed body, filled on first use
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.variants.values()) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def etag_for(self, encoding: str) -> str:
+        return self.etag if encoding == "identity" else f'{self.etag[:-1]}-{encoding}"'
+
+
+class ResponseCache:
+    """
+    Serialized GET responses keyed by (path, query, data version), LRU-evicted within
+    a byte budget. The data version is a fingerprint of the data/ files, recomputed at
+    most every version_ttl seconds and reset when a team's data changes.
+    """
+
+    def __init__(self, max_bytes: int = settings.RESPONSE_CACHE_MAX_BYTES, version_ttl: float = settings.RESPONSE_CACHE_VERSION_TTL):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 8
+        self.version_ttl = version_ttl
+        self._entries: "OrderedDict[Key, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._version: Tuple[str, float] = ("", 0.0)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.not_modified = self.evictions = 0
+        events.subscribe(events.TEAM_DATA_CHANGED, self._on_team_data_changed)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def data_version(self) -> str:
+        version, checked_at = self._version
+        now = time.monotonic()
+        if not version or now - checked_at > self.version_ttl:
+            version = data_fingerprint()
+            self._version = (version, now)
+        return version
+
+    def get(self, key: Key) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Key, entry: CachedResponse) -> bool:
+        if entry.size > self.max_entry_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+        return True
+
+    def variant(self, key: Key, entry: CachedResponse, encoding: str) -> bytes:
+        """Body in the given encoding, compressed on first request and kept with the entry."""
+        if encoding == "identity":
+            return entry.body
+        data = entry.variants.get(encoding)
+        if data is not None:
+            return data
+        data = compress(entry.body, encoding)
+        with self._lock:
+            if encoding not in entry.variants:
+                entry.variants[encoding] = data
+                if self._entries.get(key) is entry:
+                    self._bytes += len(data)
+                    self._evict()
+        return data
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = ("", 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+        }
+
+    def _on_team_data_changed(self, payload: Dict[str, Any]) -> None:
+        if payload.get("teams"):
+            self.clear()
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    return ResponseCache()
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware serving cacheable GET routes from ResponseCache. Negotiates
+    br/gzip/identity from Accept-Encoding; compressed variants are made once per entry.
+    Adds a strong per-variant ETag, Cache-Control and Vary, and answers If-None-Match
+    with 304. Only complete 200 responses within the per-entry size limit are stored;
+    NDJSON requests (Accept: application/x-ndjson) are never cached.
+    """
+
+    def __init__(self, app, cache: Optional[ResponseCache] = None, max_age: int = settings.RESPONSE_CACHE_MAX_AGE):
+        self.app = app
+        self.cache = cache or get_response_cache()
+        self.cache_control = f"public, max-age={max_age}, must-revalidate".encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.cache.enabled or not is_cacheable(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        if accepts_ndjson(request_headers.get(b"accept", b"").decode("latin-1")):
+            # streamed NDJSON goes straight through: buffering it here would defeat the streaming
+            await self.app(scope, receive, send)
+            return
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        accept_encoding = request_headers.get(b"accept-encoding", b"").decode("latin-1")
+        key = (scope["path"], normalized_query(scope.get("query_string", b"")), self.cache.data_version())
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._send_entry(send, key, entry, if_none_match, accept_encoding, b"HIT")
+            return
+
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        size = 0
+        passthrough = False
+
+        async def capture(message):
+            nonlocal size, passthrough
+            if message["type"] == "http.response.start":
+                start.update(message)
+                passthrough = message["status"] != 200
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > self.cache.max_entry_bytes:
+                # Too big to keep: flush what we have and stream the rest
+                passthrough = True
+                await send(start)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": message.get("more_body", False)})
+                chunks.clear()
+                return
+            if not message.get("more_body", False):
+                body = b"".join(chunks)
+                headers = [
+                    (k, v) for k, v in start.get("headers", [])
+                    if k.lower() not in (b"content-length", b"content-encoding", b"vary")
+                ]
+                entry = CachedResponse(headers, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+                self.cache.put(key, entry)
+                await self._send_entry(send, key, entry, if_none_match, accept_encoding, b"MISS")
+
+        await self.app(scope, receive, capture)
+
+    async def _send_entry(
+        self, send, key: Key, entry: CachedResponse, if_none_match: str, accept_encoding: str, state: bytes
+    ) -> None:
+        encoding = negotiate_encoding(accept_encoding, len(entry.body))
+        etag = entry.etag_for(encoding)
+        cache_headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", self.cache_control),
+            (b"vary", b"Accept-Encoding, Accept"),
+            (b"x-cache", state),
+        ]
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if encoding in entry.variants or encoding == "identity":
+            body = self.cache.variant(key, entry, encoding)
+        else:
+            # first request for this encoding: compress off the event loop
+            body = await anyio.to_thread.run_sync(self.cache.variant, key, entry, encoding)
+        headers = entry.headers + cache_headers + [(b"content-length", str(len(body)).encode("latin-1"))]
+        if encoding != "identity":
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -3,24 +3,41 @@ import logging
 import os
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware as Cors
+from fastapi.middleware.gzip import GZipMiddleware
 from core.config import settings
+from core.response_cache import ResponseCacheMiddleware
+from utils.serialization_utils import FastJSONResponse
 import routes.fbref.league.league as leagueRoute
 import routes.fbref.players.players as playerRoute
 import routes.fbref.mental as mentalRoute
 import routes.plotting.plot as plotRoute
+import routes.jobs.jobs as jobsRoute
+from services.jobs.job_manager import get_job_manager
 
 
     
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # background job pool + periodic refresh scheduler
+    jobs = get_job_manager()
+    jobs.start()
+    yield
+    jobs.shutdown()
+
+
 # meta
 app = FastAPI(
    title=settings.APP_NAME,
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.include_router(leagueRoute.router, prefix="/api/v2")
 app.include_router(playerRoute.router, prefix="/api/v2")
 app.include_router(mentalRoute.router, prefix="/api/v2")
 app.include_router(plotRoute.router, prefix="/api/v2")
+app.include_router(jobsRoute.router, prefix="/api/v2")
 # root
 @app.get("/", tags=["Root"])
 async def read_root():
@@ -33,7 +50,12 @@ async def read_root():
 async def head_root():
     return Response(status_code=200)
 
-# app.add_middleware(GZipMiddleware, minimum_size=1000)
+# ETag/304 response cache for data-derived GET routes; negotiates br/gzip itself
+# (inside CORS, so 304s get CORS headers)
+app.add_middleware(ResponseCacheMiddleware)
+
+# gzip for everything else; responses already carrying Content-Encoding pass through
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # cors
 # TODO: add DB url. add srver url.
@@ -0,0 +1,24 @@
+from typing import Dict, List, Set
+
+
+TEAM_STAT_TYPES: List[str] = ['standard', 'keeper', 'keeper_adv', 'shooting', 'passing', 'passing_types', 'goal_shot_creation', 'defense', 'possession', 'playing_time', 'misc']
+
+# rank 1 = lowest value for these (stat_type -> metric keys); everything else ranks highest first.
+# Matches the rank direction already present in data/league_init.
+TEAM_LOWER_IS_BETTER: Dict[str, Set[str]] = {
+    "standard": {"Performance_CrdY", "Performance_CrdR", "Progression_PrgC", "Progression_PrgP"},
+    "keeper": {"Performance_GA", "Performance_GA90", "Performance_SoTA", "Performance_L"},
+    "keeper_adv": {
+        "Goals_GA", "Goals_PKA", "Goals_FK", "Goals_CK", "Goals_OG",
+        "Expected_PSxG", "Expected_PSxG/SoT", "Goal Kicks_Launch%",
+    },
+    "shooting": {"Standard_Dist"},
+    "passing_types": {"Outcomes_Off", "Outcomes_Blocks"},
+    "defense": {"Challenges_Lost", "Err"},
+    "possession": {"Take-Ons_Tkld", "Take-Ons_Tkld%", "Carries_Mis", "Carries_Dis"},
+    "playing_time": {"Team Success_onGA", "Team Success (xG)_onxGA"},
+    "misc": {"Performance_2CrdY", "Performance_Fls", "Performance_Off", "Performance_OG", "Performance_PKcon", "Aerial Duels_Lost"},
+}
+
+# pandas rank() tie methods: 'min' gives tied teams the best shared rank (1, 1, 3, ...)
+TEAM_RANK_TIE_METHOD = "min"
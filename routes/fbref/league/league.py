@@ -2,7 +2,7 @@ from __future__ import annotations
 from fastapi import APIRouter, HTTPException, Query
 from typing import Any, Dict, List, Optional
 from routes.fbref.league.league_route_helper import _find_league_dir, _index_by_team, _list_stat_types, _load_stat_file, _merge_team_metrics, _scan_league_dirs
-from services.fbref.league.fbref_utils import _sanitize
+from utils.serialization_utils import FastJSONResponse
 
 router = APIRouter(prefix="", tags=["stats"])
 
@@ -33,7 +33,7 @@ def get_league(
     league_name: str,
     season: Optional[str] = Query(None, description="e.g. 2425; if omitted, latest"),
     stat_type: str = Query("all", description="'all' or one of /stats_types"),
-) -> Dict[str, Any]:
+) -> FastJSONResponse:
     """
     stat_type = 'all'  -> merges all team_*.json files into a single per-team metrics object.
     stat_type = name   -> returns only that file's rows.
@@ -69,17 +69,17 @@ def get_league(
                     _merge_team_metrics(base, obj.get("metrics", {}))
         teams = list(teams_index.values())
         teams.sort(key=lambda x: (x.get("team") or ""))  # stable order
-        return {"ok": True, "league": league_name, "season": resolved_season, "stat_type": "all", "count": len(teams), "teams": _sanitize(teams)}
+        return FastJSONResponse({"ok": True, "league": league_name, "season": resolved_season, "stat_type": "all", "count": len(teams), "teams": teams})
 
     # single stat type
     if stat_type not in stypes:
         raise HTTPException(status_code=404, detail=f"stat_type '{stat_type}' not found. Available: {stypes}")
     rows = _load_stat_file(ldir, stat_type)
-    return {"ok": True, "league": league_name, "season": resolved_season, "stat_type": stat_type, "count": len(rows), "teams": _sanitize(rows)}
+    return FastJSONResponse({"ok": True, "league": league_name, "season": resolved_season, "stat_type": stat_type, "count": len(rows), "teams": rows})
 
 # Optional: team-by-name across merged or single stat file
 @router.get("/team/{league_name}/{team_name}")
-def get_team(league_name: str, team_name: str, season: Optional[str] = Query(None)) -> Dict[str, Any]:
+def get_team(league_name: str, team_name: str, season: Optional[str] = Query(None)) -> FastJSONResponse:
     try:
         ldir = _find_league_dir(league_name, season)
     except FileNotFoundError as e:
@@ -110,4 +110,4 @@ def get_team(league_name: str, team_name: str, season: Optional[str] = Query(Non
         raise HTTPException(status_code=404, detail=f"Team not found: {team_name}")
 
     resolved_season = season or ldir.name.rsplit("-", 1)[-1]
-    return {"ok": True, "league": league_name, "season": resolved_season, "team": team_name, "data": _sanitize(payload)}
\ No newline at end of file
+    return FastJSONResponse({"ok": True, "league": league_name, "season": resolved_season, "team": team_name, "data": payload})
\ No newline at end of file
@@ -1,31 +1,85 @@
-import json
-from fastapi import APIRouter, HTTPException
-from typing import Optional
+import logging
+from fastapi import APIRouter, Header, HTTPException
+from typing import Any, Dict, Iterator, List, Literal, Optional
 from fastapi.params import Query
-from fastapi.responses import JSONResponse, StreamingResponse
 from matplotlib.pylab import mean
 import numpy as np
-from routes.fbref.players.normalize import sanitize_for_json
+from pydantic import BaseModel, Field
 from routes.fbref.utils.mental_route_utils import build_team_meta, normalize_mental_scores, pick_best_xi
 from services.fbref.loader import FBRefLoaderService
-from services.mental.mental_service import MentalRankingService
+from services.mental.best_xi_cache import get_best_xi_cache
+from services.mental.constrained_xi_service import XIConstraints, constrained_best_xi
+from services.mental.mental_store import get_mental_store
 from services.plotting.player.plotting_service_player import PlayerPlottingService
 from services.plotting.team.team_plotting_service import TeamPlottingService
+from utils.ranking_utils import parse_cursor, player_id, score_array, top_k_indices
+from utils.serialization_utils import (
+    ANY_SUBFIELD,
+    FastJSONResponse,
+    NDJSONResponse,
+    Presets,
+    accepts_ndjson,
+    parse_fields,
+    project,
+)
+
+log = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/mental", tags=["Mental Ranking"])
 
+FIELDS_QUERY_DESCRIPTION = "Player fields: presets (summary, card, full) and/or dot paths, comma-separated"
+
+# ?fields= schemas/presets per route: team players drop __meta__ and gain mental.m_team_scaled
+_PLAYER_FIELDS = {
+    "name": None, "age": None, "position": None, "position_text": None, "role": None, "foot": None,
+    "profile_img": None, "fbref_id": None, "fbref_url": None,
+    "stats": ANY_SUBFIELD, "player_365_stats": ANY_SUBFIELD,
+    "ranking": {"performance": None, "breakdown": ANY_SUBFIELD},
+    "mental": {"m_raw": None, "m": None, "breakdown": ANY_SUBFIELD},
+}
+TEAM_PLAYER_FIELDS = {**_PLAYER_FIELDS, "mental": {**_PLAYER_FIELDS["mental"], "m_team_scaled": None}}
+LEAGUE_PLAYER_FIELDS = {**_PLAYER_FIELDS, "__meta__": {"team": None, "league": None, "season": None}}
+
+_SUMMARY = ("name", "role", "position", "age", "fbref_id", "mental.m")
+_CARD = _SUMMARY + ("position_text", "foot", "profile_img", "mental.m_raw", "ranking.performance")
+TEAM_PLAYER_PRESETS = {"summary": _SUMMARY, "card": _CARD + ("mental.m_team_scaled",), "full": None}
+LEAGUE_PLAYER_PRESETS = {
+    "summary": _SUMMARY + ("__meta__.team",),
+    "card": _CARD + ("__meta__.team", "__meta__.league"),
+    "full": None,
+}
+
+
+def _player_projection(fields: Optional[str], presets: Presets, schema: Dict[str, Any]):
+    try:
+        return parse_fields(fields, presets, schema)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class ConstrainedXIPayload(BaseModel):
+    formation: str = "433"
+    key_type: Literal["mental", "performance"] = "mental"
+    max_per_club: Optional[int] = Field(None, ge=1)
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    # subline (or no_order line) -> feet required there, one spot each, e.g. {"FB": ["left"]}
+    feet: Dict[str, List[Literal["left", "right"]]] = {}
+    budget: Optional[float] = Field(None, ge=0)
+    cost_field: str = "market_value"
+    time_budget_ms: int = Field(500, ge=10, le=10000)
+
+
+@router.get("/best-xi/stats")
+def get_best_xi_cache_stats():
+    return get_best_xi_cache().stats()
+
 
 # get by league
 @router.get("/{league}/{season}/all")
 def get_league_mental_scores(league: str, season: int):
-    # 1️ Load players
-    players = FBRefLoaderService.load_all_players(league, season)
-    if not players:
-        raise HTTPException(status_code=404, detail="No players found for league/season")
-
-    # 2️ Compute mental scores
-    ranked_players = MentalRankingService(players).score_team_players()
-    filtered_players = [p for p in ranked_players if p.get("mental", {}).get("m_raw") is not None]
+    # 1️ Load materialized mental scores (rescored only when player files change)
+    filtered_players = get_mental_store().get_players(league, season)
     if not filtered_players:
         raise HTTPException(status_code=404, detail="No mental scores found for league/season")
 
@@ -38,8 +92,10 @@ def get_league_mental_scores(league: str, season: int):
     # 4️ Teams meta
     teams_sorted = build_team_meta(filtered_players, league, season)
 
-    # 5️ Best XI
-    best_xi = pick_best_xi(filtered_players)
+    # 5️ Best XI (cached per data/scoring version)
+    best_xi = get_best_xi_cache().get_or_compute(
+        ("league", league, str(season)), [league], lambda: pick_best_xi(filtered_players)
+    )
  
     # 6️ League meta
     league_meta = {
@@ -55,7 +111,7 @@ def get_league_mental_scores(league: str, season: int):
     # 7️ Teams stats
     team_stats = FBRefLoaderService.load_teams_stats(league, season)
 
-    return JSONResponse(sanitize_for_json({
+    return FastJSONResponse({
         "league_meta": league_meta,
         "players": top_players,
         "teams": {
@@ -63,54 +119,73 @@ def get_league_mental_scores(league: str, season: int):
             "stats": team_stats
         },
         "best_eleven": best_xi
-       }),  headers={"Content-Encoding": "identity"})
+       })
+
+
+def _iter_all_players(leagues: List[str], season: int) -> Iterator[dict]:
+    """
+    Every scored player of the leagues, normalized and ordered like the /all listing. Only
+    the m_raw arrays are gathered up front; players are copied from the store tables one
+    at a time as the stream consumes them.
+    """
+    store = get_mental_store()
+    tables = []
+    for league in leagues:
+        try:
+            tables.append((league, [p for p in store.table(league, season) if "name" in p]))
+        except Exception as e:
+            log.error("failed to load mental scores for %s: %s", league, e)
+    if not tables:
+        return
+
+    raw = np.concatenate([score_array(players, ("mental", "m_raw")) for _, players in tables])
+    finite = np.isfinite(raw)
+    m = raw
+    if finite.any():
+        lo, hi = raw[finite].min(), raw[finite].max()
+        m = np.round((raw - lo) / (hi - lo or 1e-9) * 100)
+    offsets = np.cumsum([0] + [len(players) for _, players in tables])
+
+    for i in np.argsort(-m, kind="stable").tolist():
+        t = int(np.searchsorted(offsets, i, side="right")) - 1
+        league, players = tables[t]
+        p = store.copy_player(players[i - offsets[t]])
+        p.setdefault("league", league)
+        p.setdefault("team", p["__meta__"].get("team"))
+        if finite[i]:
+            p["mental"]["m"] = int(m[i])
+        yield p
 
 
 # get all 5 leagues
 @router.get("/all")
-async def get_all_players_and_teams():
-    import json
+async def get_all_players_and_teams(accept: Optional[str] = Header(None)):
+    """Accept: application/x-ndjson streams every player (by m) one per line, without the team/best-XI aggregates."""
     from statistics import mean
     from math import isfinite
     from collections import defaultdict
 
     all_players = []
-    team_grouped: dict[str, list] = {}
     team_meta: dict[str, dict] = {}
 
-    team_paths = FBRefLoaderService.list_available_league_team_paths()
-
-    for item in team_paths:
-        league = item["league"]
-        team = item["team"]
-        path = item["path"]
+    leagues = sorted({item["league"] for item in FBRefLoaderService.list_available_league_team_paths()})
+    if accepts_ndjson(accept):
+        return NDJSONResponse(_iter_all_players(leagues, 2425))
 
+    for league in leagues:
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                raw = json.load(f)
-
-            if not isinstance(raw, dict) or "players" not in raw:
-                continue
-
-            players = raw["players"]
-            players = [p for p in players if isinstance(p, dict) and "name" in p]
-            if not players:
-                continue
-
-            scored = MentalRankingService(players).score_team_players()
-            filtered = [p for p in scored if p.get("mental", {}).get("m_raw") is not None]
-
-            for p in filtered:
-                p.setdefault("league", league)
-                p.setdefault("team", team)
-
-            all_players.extend(filtered)
-            team_grouped[f"{league}:{team}"] = filtered
-
+            scored = get_mental_store().get_players(league, 2425)
         except Exception as e:
-            print(f"[ERROR] Failed to load {path}: {e}")
+            log.error("failed to load mental scores for %s: %s", league, e)
             continue
 
+        for p in scored:
+            if "name" not in p:
+                continue
+            p.setdefault("league", league)
+            p.setdefault("team", p["__meta__"].get("team"))
+            all_players.append(p)
+
     if not all_players:
         raise HTTPException(status_code=404, detail="No mental scores found")
 
@@ -170,35 +245,40 @@ async def get_all_players_and_teams():
 
 
     teams_sorted = sorted(team_meta.values(), key=lambda t: t["avg_m"], reverse=True)
-    # Best XI
-    best_xi = pick_best_xi(top_players)
+    # Best XI (cached per data/scoring version)
+    best_xi = get_best_xi_cache().get_or_compute(("all", "2425"), leagues, lambda: pick_best_xi(top_players))
 
     league_stats= FBRefLoaderService.load_all_leagues_stats(2425)
     top_players = top_players[:100]
     # Final response
-    return JSONResponse(sanitize_for_json({
+    return FastJSONResponse({
         "players": top_players,
         "teams": {
             "mental": teams_sorted,
             "stats": league_stats
         },
         "best_eleven": best_xi
-    }),  headers={"Content-Encoding": "identity"})
+    })
 
 
 @router.get("/{league}/{season}/{team}")
-async def get_team_mental_scores(league: str, season: int, team: str):
-    # --- Load team players ---
-    team_data = FBRefLoaderService.load_team_players(league, season, team)
-    if not team_data:
+async def get_team_mental_scores(
+    league: str,
+    season: int,
+    team: str,
+    fields: Optional[str] = Query(None, description=FIELDS_QUERY_DESCRIPTION),
+):
+    projection = _player_projection(fields, TEAM_PLAYER_PRESETS, TEAM_PLAYER_FIELDS)
+
+    # --- Load team players from the materialized league table ---
+    if not FBRefLoaderService.load_team_players(league, season, team):
         raise HTTPException(status_code=404, detail="Team data not found")
 
-    # --- Compute mental scores ---
-    scored_players = MentalRankingService(team_data).score_team_players()
+    scored_players = get_mental_store().get_team_players(league, season, team)
     filtered_players = [
-        p for p in scored_players
-        if p.get("mental", {}).get("m_raw") is not None
-        and np.isfinite(p.get("mental", {}).get("m_raw", float("nan")))
+        {k: v for k, v in p.items() if k != "__meta__"}
+        for p in scored_players
+        if np.isfinite(p["mental"]["m_raw"])
     ]
     if not filtered_players:
         raise HTTPException(status_code=404, detail="No mental scores found for this team")
@@ -218,8 +298,10 @@ async def get_team_mental_scores(league: str, season: int, team: str):
     # --- Sort descending by league-wide 'm' ---
     filtered_players.sort(key=lambda p: p["mental"]["m"], reverse=True)
 
-    # --- Best XI ---
-    best_xi = pick_best_xi(filtered_players)
+    # --- Best XI (cached per data/scoring version) ---
+    best_xi = get_best_xi_cache().get_or_compute(
+        ("team", league, str(season), team.lower()), [league], lambda: pick_best_xi(filtered_players)
+    )
 
     # --- Team mental summary ---
     team_mental = {
@@ -250,15 +332,20 @@ async def get_team_mental_scores(league: str, season: int, team: str):
     all_team_stats = FBRefLoaderService.load_teams_stats(league, season)
     team_stats = FBRefLoaderService.filter_stats_by_team(all_team_stats, team)
 
-    # --- Instantiate plotting service ONCE ---
-    plotter = TeamPlottingService(league, season, team)
-    team_charts_data = await plotter.get_team_default_chart()
-    heatmaps = await plotter.get_team_heatmaps()
+    # --- Pre-rendered charts if fresh, else instantiate plotting service ONCE ---
+    prerendered = TeamPlottingService.load_prerendered(league, season, team)
+    if prerendered:
+        team_charts_data = prerendered["default"]
+        heatmaps = prerendered["heatmap"]
+    else:
+        plotter = TeamPlottingService(league, season, team)
+        team_charts_data = await plotter.get_team_default_chart()
+        heatmaps = await plotter.get_team_heatmaps()
 
     # --- Return ---
-    return JSONResponse(
-        sanitize_for_json({
-            "players": filtered_players,
+    return FastJSONResponse(
+        {
+            "players": project(filtered_players, projection),
             "stats": {
                 "mental": team_mental,
                 "stats": team_stats,
@@ -271,9 +358,39 @@ async def get_team_mental_scores(league: str, season: int, team: str):
                     "defending": heatmaps["defending"],
                 },
             },
-        }),
-        headers={"Content-Encoding": "identity"},
+        },
+    )
+@router.post("/{league}/{season}/best-xi")
+def get_constrained_best_xi(league: str, season: int, payload: ConstrainedXIPayload):
+    """Best XI under constraints; league 'all' searches every available league."""
+    leagues = [league]
+    if league == "all":
+        leagues = sorted({item["league"] for item in FBRefLoaderService.list_available_league_team_paths()})
+
+    players = []
+    for lg in leagues:
+        for p in get_mental_store().get_players(lg, season):
+            p.setdefault("league", lg)
+            p.setdefault("team", p["__meta__"].get("team"))
+            players.append(p)
+    if not players:
+        raise HTTPException(status_code=404, detail="No mental scores found for league/season")
+
+    constraints = XIConstraints(
+        max_per_club=payload.max_per_club,
+        min_age=payload.min_age,
+        max_age=payload.max_age,
+        feet=payload.feet,
+        budget=payload.budget,
+        cost_field=payload.cost_field,
     )
+    try:
+        result = constrained_best_xi(players, payload.formation, payload.key_type, constraints, payload.time_budget_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(result)
+
+
 # get by tname or role.
 @router.get("/vv/players/{league}/{season}")
 def get_players_by_role_or_name(
@@ -281,47 +398,51 @@ def get_players_by_role_or_name(
     season: int,
     name: Optional[str] = Query(None, description="Filter players by name"),
     role: Optional[str] = Query(None, description="Filter players by role"),
-    top_k: Optional[int] = Query(None, description="Limit number of players returned"),
+    top_k: Optional[int] = Query(None, ge=1, description="Page size (all players when omitted)"),
+    after: Optional[str] = Query(None, description="Cursor '<m>,<id>' from next_cursor"),
+    fields: Optional[str] = Query(None, description=FIELDS_QUERY_DESCRIPTION),
+    accept: Optional[str] = Header(None),
 ):
-    print(f"[DEBUG] Fetching players for league={league}, season={season}, name={name}, role={role}")
+    """Without top_k, Accept: application/x-ndjson streams the players one per line instead of one JSON body."""
+    projection = _player_projection(fields, LEAGUE_PLAYER_PRESETS, LEAGUE_PLAYER_FIELDS)
 
-    # Load all players
-    players = FBRefLoaderService.load_all_players(league, season)
-    if not players:
+    # Load materialized mental scores
+    scored_players = get_mental_store().get_players(league, season, scored_only=False)
+    if not scored_players:
         raise HTTPException(status_code=404, detail="No players found")
 
-    # Score mentally
-    scored_players = MentalRankingService(players).score_team_players()
-
     # Role filter
     if role:
-        before = len(scored_players)
         scored_players = [p for p in scored_players if p.get("role") == role]
 
     # Name filter (partial match)
     if name:
         name_norm = name.lower().strip()
-        before = len(scored_players)
         scored_players = [p for p in scored_players if name_norm in (p.get("name") or "").lower()]
 
     if not scored_players:
         raise HTTPException(status_code=404, detail="No matching players found")
 
-    # Sort by mental score
-    scored_players.sort(key=lambda p: p.get("mental", {}).get("m", 0), reverse=True)
-
-    # Limit
-    if top_k:
-        scored_players = scored_players[:top_k]
-
-    return JSONResponse(sanitize_for_json({
+    # Top-K by mental score (missing m ranks as 0), stable by player id
+    try:
+        cursor = parse_cursor(after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    scores = np.nan_to_num(score_array(scored_players, ("mental", "m")), nan=0.0)
+    idx, next_cursor = top_k_indices(scores, [player_id(p) for p in scored_players], top_k, cursor)
+    if top_k is None and accepts_ndjson(accept):
+        return NDJSONResponse(project(scored_players[i], projection) for i in idx)
+    scored_players = [scored_players[i] for i in idx]
+
+    return FastJSONResponse({
         "league": league,
         "season": season,
         "role": role,
         "name_query": name,
         "count": len(scored_players),
-        "players": scored_players,
-    }), headers={"Content-Encoding": "identity"})
+        "next_cursor": next_cursor,
+        "players": project(scored_players, projection),
+    })
 
 
 @router.get("/vv/players/{league}/{season}/plot")
@@ -330,15 +451,12 @@ def get_player_plot(
     season: int,
     name: str = Query(..., description="Exact player name for plotting"),
 ):
-    print(f"[DEBUG] Generating plot for league={league}, season={season}, name={name}")
 
-    # Load all players
-    players = FBRefLoaderService.load_all_players(league, season)
+    # Load materialized mental scores
+    players = get_mental_store().get_players(league, season, scored_only=False)
     if not players:
         raise HTTPException(status_code=404, detail="No players found")
-
-    # Score mentally
-    scored_players = MentalRankingService(players).score_team_players()
+    scored_players = players
 
     # Find exact match
     match = next((p for p in scored_players if (p.get("name") or "").lower() == name.lower()), None)
@@ -349,9 +467,9 @@ def get_player_plot(
     service = PlayerPlottingService(players)
     img_base64 = service.plot_player_pizza(match)
 
-    return JSONResponse(sanitize_for_json({
+    return FastJSONResponse({
         "league": league,
         "season": season,
         "player": match.get("name"),
         "plot": img_base64,
-    }), headers={"Content-Encoding": "identity"})
\ No newline at end of file
+    })
\ No newline at end of file
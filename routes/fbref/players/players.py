@@ -1,44 +1,147 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from routes.fbref.players.normalize import normalize_scores, sanitize_for_json
-from services.fbref.player.player_service import FBRefPlayerService
-from services.ranking.player_ranking_service import FBRefPlayerRankingService
+from typing import Dict, List, Literal, Optional, Union
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from models.ranking.ranking import ROLE_RANK_MAPPING
+from routes.fbref.players.normalize import normalize_scores
+from services.fbref.build_runner import DEFAULT_LEAGUES, DEFAULT_SEASONS, load_last_summary
+from services.jobs.job_manager import get_job_manager
+from services.ranking.custom_scoring_service import get_custom_scoring_service
+from services.ranking.player_ranking_service import FBRefPlayerRankingService, get_ranked_table
+from services.ranking.role_stats_index import get_role_stats_index
+from utils.ranking_utils import parse_cursor, top_k_indices
+from utils.serialization_utils import FastJSONResponse
 
 router = APIRouter(prefix="/players", tags=["FBref Players"])
 
-@router.post("/{league}/{season}/build")
+
+class CustomScorePayload(BaseModel):
+    kind: Literal["rank", "mental"] = "rank"
+    # rank: {role: {"group:metric": weight}}; mental: {role | "ALL": {trait: ["group:metric", ...]}}
+    mapping: Dict[str, Dict[str, Union[float, str, List[str]]]]
+    role: Optional[str] = None
+    top: int = Field(50, ge=1, le=1000)
+
+
+class ScoreSweepPayload(BaseModel):
+    # each variant: {role: {"group:metric": weight}}; roles missing from a variant score 0
+    variants: List[Dict[str, Dict[str, float]]] = Field(..., min_length=1, max_length=500)
+    include_baseline: bool = True  # prepend ROLE_RANK_MAPPING as variant 0
+    role: Optional[str] = None
+    top_k: int = Field(20, ge=1, le=500)
+
+
+@router.post("/{league}/{season}/build", status_code=202)
 async def build_league_players(league: str, season: str):
-    svc = FBRefPlayerService(league, season)
-    svc.build_team_jsons()
-    return {"ok": True, "league": league, "season": season}
+    job = get_job_manager().submit("build", league, season)
+    return {"ok": True, "league": league, "season": season, "job_id": job.id, "status": job.status}
+
+
+@router.post("/build", status_code=202)
+async def build_many_leagues(
+    leagues: Optional[List[str]] = Query(None, description="Defaults to all five leagues"),
+    seasons: Optional[List[str]] = Query(None, description="e.g. 2425"),
+):
+    leagues = leagues or DEFAULT_LEAGUES
+    seasons = seasons or DEFAULT_SEASONS
+    job = get_job_manager().submit_build(leagues, seasons)
+    return {"ok": True, "leagues": job.leagues, "seasons": job.seasons, "job_id": job.id, "status": job.status}
+
+
+@router.get("/build/summary")
+async def get_build_summary():
+    summary = load_last_summary()
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No build has been run yet")
+    return summary
 
 
-@router.post("/{league}/rank")
+@router.post("/{league}/rank", status_code=202)
 async def rank_league_players(league: str):
-    svc = FBRefPlayerRankingService(league)
-    svc.rank_players()
-    return {"ok": True, "league": league}
+    job = get_job_manager().submit("rank", league)
+    return {"ok": True, "league": league, "job_id": job.id, "status": job.status}
 
 
 @router.get("/{league}/{season}/all")
-async def get_all_ranked_players(league: str, season: str):
-    svc = FBRefPlayerRankingService(league)
-    players = svc.load_players()
-    players = normalize_scores(players)
+async def get_all_ranked_players(
+    league: str,
+    season: str,
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor '<score>,<id>' from the X-Next-Cursor header"),
+):
+    try:
+        cursor = parse_cursor(after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Precomputed performance/normalized arrays; players without a score are skipped
+    table = get_ranked_table(league)
+    idx, next_cursor = top_k_indices(table.scores, table.ids, limit, cursor)
+
+    page = []
+    for i in idx:
+        player = dict(table.players[i])
+        player["ranking"] = {**player["ranking"], "normalized": round(float(table.normalized[i]), 2)}
+        page.append(player)
+
+    # NaN/inf encode as null in FastJSONResponse
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(page, headers=headers)
+
+
+@router.get("/{league}/{season}/compare")
+async def compare_player_metric(
+    league: str,
+    season: str,
+    metric: str = Query(..., description="'group:stat', e.g. 'defense:Tkl+Int'"),
+    role: Optional[str] = Query(None, description="Base role group, e.g. CB. Defaults to the player's"),
+    name: Optional[str] = Query(None, description="Player whose value to place"),
+    value: Optional[float] = Query(None, description="Raw value to place (instead of a player)"),
+):
+    index = get_role_stats_index(league, season)
+    player = None
+    if name:
+        player = index.player(name)
+        if player is None:
+            raise HTTPException(status_code=404, detail=f"No player named '{name}'")
+        role = role or player["role"]
+        if value is None:
+            value = index.player_value(player, metric)
+    if not role:
+        raise HTTPException(status_code=400, detail="Pass a role or a player name")
 
-    # Keep only players with a valid performance score
-    players = [p for p in players if p.get("ranking", {}).get("performance") is not None]
+    result = index.describe(role.upper(), metric, value)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No '{metric}' values for role '{role}'")
+    if player:
+        result.update({"player": player["name"], "team": player["team"]})
+    return FastJSONResponse(result)
 
-    # Sort descending by performance
-    players.sort(key=lambda p: p["ranking"]["performance"], reverse=True)
 
-    # Take top 50
-    top_50 = players[:50]
+@router.post("/{league}/{season}/score")
+async def score_custom_mapping(league: str, season: str, payload: CustomScorePayload):
+    """Rank a league with a caller-supplied weight (kind=rank) or trait (kind=mental) mapping."""
+    try:
+        result = get_custom_scoring_service().rankings(
+            league, season, payload.kind, payload.mapping, role=payload.role, top=payload.top
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(result)
 
-    # Cleanse for JSON (remove NaNs, infs, etc.)
-    top_50 = sanitize_for_json(top_50)
 
-    return JSONResponse(top_50)
+@router.post("/{league}/{season}/score/sweep")
+async def sweep_weight_variants(league: str, season: str, payload: ScoreSweepPayload):
+    """Score many ROLE_RANK_MAPPING variants in one product and compare their rankings. Read-only."""
+    variants = ([ROLE_RANK_MAPPING] if payload.include_baseline else []) + payload.variants
+    try:
+        result = get_custom_scoring_service().sweep(league, season, variants, top_k=payload.top_k, role=payload.role)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(result)
 
 
 @router.get("/{league}/{season}/by-role/{role}")
@@ -5,7 +5,7 @@ from statistics import mean
 from math import isfinite
 import numpy as np
 
-from services.mental.best_11_service import FORMATIONS, LINES, BestXIBuilder
+from services.mental.best_11_service import BestXIBuilder
 
 
 def normalize_mental_scores(players: List[Dict]) -> None:
@@ -65,9 +65,6 @@ def pick_best_xi(players: List[Dict]) -> Dict:
       - top 3 formations by mental score (with starting 11 and subs)
       - best performing eleven based on 'ranking.performance' across all players
     """
-    # Log top players per role for debug
-    BestXIBuilder.log_top_players_per_role(players, top_n=10)
-
     builder = BestXIBuilder(players)
     top_formations_raw = builder.build_best_formations(top_n=3)
 
@@ -90,10 +87,7 @@ def pick_best_xi(players: List[Dict]) -> Dict:
     # Build top formations with minimal player data
     top_formations = []
     for formation in top_formations_raw:
-        used_names = {p["name"] for p in formation["starting_11"]}
-        remaining_players = [p for p in players if p["name"] not in used_names]
-        remaining_players.sort(key=lambda p: p.get("mental", {}).get("m_raw", 0), reverse=True)
-        subs = remaining_players[:7]
+        subs = builder.substitutes(builder.solve_indexes(formation["name"]), "mental", limit=7, any_role=True)
 
         top_formations.append({
             "formation": formation["name"],
@@ -104,22 +98,11 @@ def pick_best_xi(players: List[Dict]) -> Dict:
 
     # Build best performing eleven using the same builder/formation logic
     formation_name = "433"  # or pick a default formation you prefer
-    used_names = set()
-    starting_11_perf = []
-
-    for line_name, formation_line in FORMATIONS[formation_name].items():
-        line_def = LINES[line_name]
-        starting_11_perf.extend(
-            builder._pick_line(line_def, formation_line, used_names, key_type="performance")
-        )
+    starting_idx_perf = builder.solve_indexes(formation_name, key_type="performance")
+    starting_11_perf = [builder.index.players[i] for i in starting_idx_perf]
 
     # Pick top 7 subs by performance
-    remaining_players_perf = [p for p in players if p["name"] not in used_names]
-    remaining_players_perf.sort(
-        key=lambda p: float(p.get("ranking", {}).get("performance", "-inf")),
-        reverse=True
-    )
-    subs_perf = remaining_players_perf[:7]
+    subs_perf = builder.substitutes(starting_idx_perf, "performance", limit=7, any_role=True)
 
     best_performing_eleven = {
         "formation": formation_name,
@@ -0,0 +1,36 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from services.fbref.build_runner import DEFAULT_SEASONS
+from services.jobs.job_manager import JOB_KINDS, get_job_manager
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.post("/{kind}", status_code=202)
+async def submit_job(
+    kind: str,
+    league: str = Query(..., description="e.g. 'ENG-Premier League'"),
+    season: str = Query(DEFAULT_SEASONS[0], description="e.g. 2425"),
+):
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind '{kind}'. Expected one of {sorted(JOB_KINDS)}")
+    job = get_job_manager().submit(kind, league, season)
+    return {"ok": True, "job_id": job.id, "status": job.status}
+
+
+@router.get("")
+async def list_jobs(status: Optional[str] = None, league: Optional[str] = None):
+    manager = get_job_manager()
+    return {
+        "next_refresh": manager.next_refresh(),
+        "jobs": [j.to_dict() for j in manager.list(status=status, league=league)],
+    }
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job.to_dict()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from tqdm import tqdm
+
+from core.events import TEAM_DATA_CHANGED, publish
+from models.fbref.fbref_types import LEAGUE_NAME_MAP
+from services.fbref.league.fbref_utils import _atomic_write_json, _sanitize
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LEAGUES: List[str] = list(LEAGUE_NAME_MAP.keys())
+DEFAULT_SEASONS: List[str] = ["2425"]
+BUILD_SUMMARY_FILE = Path("data/build/last_build.json")
+
+
+def _run_stage(stages: Dict[str, Any], name: str, fn) -> bool:
+    """Run one build stage, recording its duration and result (or error) under stages[name]."""
+    start = time.perf_counter()
+    try:
+        result = fn()
+        stages[name] = {"ok": True, "seconds": round(time.perf_counter() - start, 3), "result": result}
+        return True
+    except Exception as e:
+        log.exception("stage %s failed", name)
+        stages[name] = {"ok": False, "seconds": round(time.perf_counter() - start, 3), "error": str(e)}
+        return False
+
+
+def build_league(league: str, season: str) -> Dict[str, Any]:
+    """
+    Process-pool worker: builds player JSONs, team files and league_init rank tables for one league/season.
+    Imports live here so each worker process owns its own soccerdata readers.
+    """
+    from soccerdata import FBref
+    from services.fbref.league.fbref_service import FBrefService
+    from services.fbref.league.team_stats_builder import TeamStatsBuilder
+    from services.fbref.player.player_service import FBRefPlayerService
+    from services.fbref.player.utils import FBrefTableReader
+
+    start = time.perf_counter()
+    stages: Dict[str, Any] = {}
+    # one reader per league: both stages share the tables it has already loaded
+    reader = FBrefTableReader(FBref(leagues=[league], seasons=[season]), league, season)
+    _run_stage(stages, "players", lambda: FBRefPlayerService(league, season, reader).build_team_jsons())
+    _run_stage(stages, "teams", lambda: FBrefService(league, season, reader).save_all_teams())
+    _run_stage(stages, "league_init", lambda: TeamStatsBuilder(league, season, reader).build_all())
+
+    return {
+        "league": league,
+        "season": season,
+        "ok": all(s["ok"] for s in stages.values()),
+        "seconds": round(time.perf_counter() - start, 3),
+        "stages": stages,
+    }
+
+
+def raise_for_failed_stages(result: Dict[str, Any]) -> None:
+    if not result["ok"]:
+        failed = {name: s["error"] for name, s in result["stages"].items() if not s["ok"]}
+        raise RuntimeError(f"build stages failed: {failed}")
+
+
+def publish_changes(result: Dict[str, Any]) -> None:
+    """
+    Announce the teams a build_league result rewrote on this process's event bus.
+    Call it in the process serving requests: builds run in pool workers whose bus has
+    no subscribers. Standalone CLI runs reach the server only via the data-version fingerprints.
+    """
+    players = (result.get("stages") or {}).get("players") or {}
+    changed = (players.get("result") or {}).get("changed")
+    if changed:
+        publish(TEAM_DATA_CHANGED, {"league": result["league"], "season": result["season"], "teams": changed})
+
+
+def build_leagues(
+    leagues: Optional[Sequence[str]] = None,
+    seasons: Optional[Sequence[str]] = None,
+    max_workers: Optional[int] = None,
+    progress: bool = True,
+) -> Dict[str, Any]:
+    """Build every (league, season) pair across a process pool and persist the summary."""
+    leagues = list(leagues or DEFAULT_LEAGUES)
+    seasons = [str(s) for s in (seasons or DEFAULT_SEASONS)]
+    jobs = [(league, season) for season in seasons for league in leagues]
+
+    start = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=max_workers or len(jobs) or 1) as pool:
+        futures = {pool.submit(build_league, league, season): (league, season) for league, season in jobs}
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="build", disable=not progress):
+            league, season = futures[fut]
+            try:
+                results.append(fut.result())
+                publish_changes(results[-1])
+            except Exception as e:
+                log.exception("failed to build %s %s", league, season)
+                results.append({"league": league, "season": season, "ok": False, "error": str(e)})
+
+    order = {job: i for i, job in enumerate(jobs)}
+    results.sort(key=lambda r: order[(r["league"], r["season"])])
+
+    summary: Dict[str, Any] = {
+        "leagues": leagues,
+        "seasons": seasons,
+        "ok": all(r["ok"] for r in results),
+        "seconds": round(time.perf_counter() - start, 3),
+        "results": results,
+    }
+    _atomic_write_json(BUILD_SUMMARY_FILE, _sanitize(summary))
+    return summary
+
+
+def load_last_summary() -> Optional[Dict[str, Any]]:
+    if not BUILD_SUMMARY_FILE.exists():
+        return None
+    return json.loads(BUILD_SUMMARY_FILE.read_text(encoding="utf-8"))
+
+
+# ------------------ Entry ------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build player JSONs and team stats for many leagues in parallel.")
+    parser.add_argument("--leagues", nargs="+", default=DEFAULT_LEAGUES, help="e.g. 'ENG-Premier League'")
+    parser.add_argument("--seasons", nargs="+", default=DEFAULT_SEASONS, help="e.g. 2425")
+    parser.add_argument("--workers", type=int, default=None, help="process count (default: one per league/season)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    summary = build_leagues(args.leagues, args.seasons, max_workers=args.workers)
+
+    for r in summary["results"]:
+        mark = "✅" if r["ok"] else "❌"
+        timings = ", ".join(f"{name} {s['seconds']}s" for name, s in r.get("stages", {}).items())
+        print(f"{mark} {r['league']} {r['season']}: {r.get('seconds', 0)}s ({timings or r.get('error')})")
+    print(f"⏱️ Total {summary['seconds']}s → {BUILD_SUMMARY_FILE}")
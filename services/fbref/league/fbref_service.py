@@ -1,9 +1,12 @@
 from __future__ import annotations
 import logging
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
 from soccerdata import FBref
 from services.fbref.league.fbref_utils import _atomic_write_json, _safe_name, _sanitize, _sanitize_value
+from services.fbref.player.utils import FBrefTableReader
 
 
 class FBrefService:
@@ -12,60 +15,79 @@ class FBrefService:
     saves one JSON per team into data/teams/<league>/<team>.json
     """
 
-    def __init__(self, league: str, season: str):
+    def __init__(self, league: str, season: str, reader: Optional[FBrefTableReader] = None):
         self.league = league
         self.season = season
-        self.fbref = FBref(leagues=[league], seasons=[season])
+        self.reader = reader or FBrefTableReader(FBref(leagues=[league], seasons=[season]), league, season)
+        self.fbref = self.reader.fb
         self.base_dir = Path("data/teams") / _safe_name(league)
+        self._table: Optional[pd.DataFrame] = None
+        self._partitions: Optional[Dict[str, pd.DataFrame]] = None
         logging.info("FBrefService: %s / %s", league, season)
 
     def _team_list(self) -> List[str]:
         """Get list of teams in this league/season."""
-        df = self.fbref.read_team_season_stats(stat_type="standard", opponent_stats=False)
+        df = self.reader.read_team("standard")
         if df is None or df.empty:
             return []
         return sorted(df.reset_index()["squad"].dropna().unique().tolist())
 
-    def fetch_team(self, team: str) -> Dict[str, Any]:
-        """Fetch stats for a single team, return JSON object."""
-        df = self.fbref.read_player_season_stats(stat_type="standard")
-        if df is None or df.empty:
-            return {"league": self.league, "season": self.season, "team": team, "players": []}
+    def _league_table(self) -> pd.DataFrame:
+        """Read the league-wide player table once per service instance."""
+        if self._table is None:
+            df = self.reader.read("standard")
+            self._table = pd.DataFrame() if df is None or df.empty else df.reset_index()
+        return self._table
 
-        df = df.reset_index()
-        team_df = df[df["squad"].str.lower() == team.lower()]
-        if team_df.empty:
-            return {"league": self.league, "season": self.season, "team": team, "players": []}
+    def _partition_by_team(self) -> Dict[str, pd.DataFrame]:
+        """Split the league table by squad (case-insensitive) with a single groupby."""
+        if self._partitions is None:
+            df = self._league_table()
+            if df.empty:
+                self._partitions = {}
+            else:
+                keys = df["squad"].str.lower()
+                self._partitions = {k: g for k, g in df.groupby(keys, sort=False)}
+        return self._partitions
 
-        players: List[Dict[str, Any]] = []
-        for _, row in team_df.iterrows():
-            metrics = {k: _sanitize_value(v) for k, v in row.items() if k not in ("player", "squad", "nation", "pos")}
-            players.append({
-                "player": row["player"],
-                "pos": row.get("pos"),
-                "metrics": metrics,
-            })
+    def _team_payload(self, team: str, team_df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"league": self.league, "season": self.season, "team": team, "players": []}
+        if team_df is None or team_df.empty:
+            return payload
 
-        return {
-            "league": self.league,
-            "season": self.season,
-            "team": team,
-            "players": players,
-        }
+        metric_cols = [c for c in team_df.columns if c not in ("player", "squad", "nation", "pos")]
+        names = team_df["player"].tolist()
+        positions = team_df["pos"].tolist() if "pos" in team_df.columns else [None] * len(names)
+        columns = [[_sanitize_value(v) for v in team_df[c].tolist()] for c in metric_cols]
+
+        payload["players"] = [
+            {
+                "player": name,
+                "pos": pos,
+                "metrics": dict(zip(metric_cols, values)),
+            }
+            for name, pos, *values in zip(names, positions, *columns)
+        ]
+        return payload
+
+    def fetch_team(self, team: str) -> Dict[str, Any]:
+        """Fetch stats for a single team, return JSON object."""
+        return self._team_payload(team, self._partition_by_team().get(team.lower()))
 
-    def save_team(self, team: str) -> Path:
-        data = self.fetch_team(team)
+    def save_team(self, team: str, data: Optional[Dict[str, Any]] = None) -> Path:
+        data = data if data is not None else self.fetch_team(team)
         path = self.base_dir / f"{_safe_name(team)}.json"
         _atomic_write_json(path, _sanitize(data))
         return path
 
     def save_all_teams(self) -> Dict[str, Any]:
         teams = self._team_list()
+        partitions = self._partition_by_team()
         summary: Dict[str, Any] = {"league": self.league, "season": self.season, "teams": []}
 
         for t in teams:
             try:
-                path = self.save_team(t)
+                path = self.save_team(t, self._team_payload(t, partitions.get(t.lower())))
                 summary["teams"].append({"team": t, "file": str(path)})
             except Exception as e:
                 logging.exception("failed to save %s", t)
@@ -1,6 +1,6 @@
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 import pandas as pd
 import numpy as np
 def _safe_name(s: str) -> str:
@@ -30,8 +30,9 @@ def _sanitize(obj: Any) -> Any:
         return [_sanitize(x) for x in obj]
     return _sanitize_value(obj)
 
-def _atomic_write_json(path: Path, payload: Any) -> None:
+def _atomic_write_json(path: Path, payload: Any, indent: Optional[int] = 2) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    separators = None if indent is not None else (",", ":")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=indent, separators=separators), encoding="utf-8")
     tmp.replace(path)
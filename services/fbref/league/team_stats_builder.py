@@ -0,0 +1,109 @@
+from __future__ import annotations
+import logging
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+from soccerdata import FBref
+
+from models.team.team_stats import TEAM_LOWER_IS_BETTER, TEAM_RANK_TIE_METHOD, TEAM_STAT_TYPES
+from services.fbref.league.fbref_utils import _atomic_write_json, _safe_name, _sanitize_value
+from services.fbref.player.utils import FBrefTableReader
+
+log = logging.getLogger(__name__)
+
+LEAGUE_INIT_DIR = Path("data/league_init")
+ID_COLS = ("league", "season", "team", "squad", "url")
+
+
+class TeamStatsBuilder:
+    """
+    Builds data/league_init/<league>-<season>/team_<stat_type>.json:
+    one row per team with {value, rank} for every numeric metric,
+    ranked for all metrics of a stat type in a single vectorized pass.
+    """
+
+    def __init__(
+        self,
+        league: str,
+        season: str,
+        reader: Optional[FBrefTableReader] = None,
+        tie_method: str = TEAM_RANK_TIE_METHOD,
+        lower_is_better: Optional[Dict[str, Iterable[str]]] = None,
+    ):
+        self.league = league
+        self.season = str(season)
+        self.reader = reader or FBrefTableReader(FBref(leagues=[league], seasons=[season]), league, season)
+        self.tie_method = tie_method
+        self.lower_is_better = {k: set(v) for k, v in (lower_is_better or TEAM_LOWER_IS_BETTER).items()}
+        self.out_dir = LEAGUE_INIT_DIR / f"{_safe_name(league)}-{self.season}"
+
+    def build_all(self, stat_types: Iterable[str] = TEAM_STAT_TYPES) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {"league": self.league, "season": self.season, "stat_types": [], "skipped": []}
+        for stat_type in stat_types:
+            try:
+                df = self.reader.read_team(stat_type)
+            except Exception as e:
+                log.warning("Failed team stat %s: %s", stat_type, e)
+                df = None
+
+            if df is None or df.empty:
+                summary["skipped"].append(stat_type)
+                continue
+
+            rows = self.rank_table(stat_type, df)
+            path = self.out_dir / f"team_{stat_type}.json"
+            _atomic_write_json(path, rows, indent=None)
+            summary["stat_types"].append({"stat_type": stat_type, "teams": len(rows), "file": str(path)})
+        return summary
+
+    def rank_table(self, stat_type: str, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        df = self._flatten(df.reset_index())
+        team_col = "team" if "team" in df.columns else "squad"
+        df = df.sort_values(team_col, kind="stable").reset_index(drop=True)
+
+        values = df[[c for c in df.columns if c not in ID_COLS]].apply(pd.to_numeric, errors="coerce")
+        values = values.loc[:, values.notna().any()]
+        ranks = self.rank_frame(values, self.lower_is_better.get(stat_type, set()), self.tie_method)
+
+        cols = list(values.columns)
+        value_lists = [[self._json_number(v) for v in values[c].tolist()] for c in cols]
+        rank_lists = [[None if math.isnan(r) else int(r) for r in ranks[c].tolist()] for c in cols]
+
+        rows = []
+        for i, team in enumerate(df[team_col].tolist()):
+            rows.append({
+                "league": self.league,
+                "season": self.season,
+                "team": team,
+                "metrics": {c: {"value": vals[i], "rank": rks[i]} for c, vals, rks in zip(cols, value_lists, rank_lists)},
+            })
+        return rows
+
+    @staticmethod
+    def rank_frame(values: pd.DataFrame, lower_is_better: Iterable[str], tie_method: str = TEAM_RANK_TIE_METHOD) -> pd.DataFrame:
+        """Rank every column at once: rank 1 is the highest value, or the lowest for lower_is_better columns."""
+        lower = [c for c in values.columns if c in set(lower_is_better)]
+        higher = [c for c in values.columns if c not in set(lower)]
+        ranks = pd.concat(
+            [
+                values[higher].rank(method=tie_method, ascending=False),
+                values[lower].rank(method=tie_method, ascending=True),
+            ],
+            axis=1,
+        )
+        return ranks[values.columns]
+
+    @staticmethod
+    def _flatten(df: pd.DataFrame) -> pd.DataFrame:
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = ["_".join(str(p).strip() for p in col if str(p).strip()) for col in df.columns]
+        else:
+            df.columns = [str(c) for c in df.columns]
+        return df.loc[:, ~df.columns.duplicated()]
+
+    @staticmethod
+    def _json_number(v: Any) -> Any:
+        v = _sanitize_value(v)
+        return None if isinstance(v, float) and not math.isfinite(v) else v
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from pathlib import Path
 import json
@@ -62,27 +63,52 @@ class FBRefLoaderService:
         for file in player_dir.glob("*.json"):  # <-- only .json
             if not file.is_file():
                 continue
-            try:
-                data = json.loads(file.read_text(encoding="utf-8"))
-            except json.JSONDecodeError as e:
-                print(f"⚠️ Skipping invalid JSON file: {file} ({e})")
-                continue
-
-            team = data.get("team")
-            league_name = data.get("league")
-            actual_season = data.get("season")
-
-            for p in data.get("players", []):
-                p["__meta__"] = {
-                    "team": team,
-                    "league": league_name,
-                    "season": actual_season,
-                }
-                all_players.append(p)
+            all_players.extend(FBRefLoaderService.load_team_file_players(file))
 
         print(f"✅ Loaded {len(all_players)} players for {league} (ignoring passed-in season)")
         return all_players
 
+    @staticmethod
+    def load_team_file_players(file: Path) -> list[dict]:
+        """Players of one team file, each tagged with __meta__ {team, league, season}."""
+        try:
+            data = json.loads(file.read_text(encoding="utf-8"))
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Skipping invalid JSON file: {file} ({e})")
+            return []
+
+        meta = {"team": data.get("team"), "league": data.get("league"), "season": data.get("season")}
+        players = data.get("players", [])
+        for p in players:
+            p["__meta__"] = dict(meta)
+        return players
+
+    @staticmethod
+    def league_file_signatures(league: str) -> Dict[str, str]:
+        """{team file name: "size:mtime_ns"} for a league's player files."""
+        player_dir = Path(f"data/players/{league}")
+        if not player_dir.exists():
+            return {}
+        signatures = {}
+        for file in sorted(player_dir.glob("*.json")):
+            st = file.stat()
+            signatures[file.name] = f"{st.st_size}:{st.st_mtime_ns}"
+        return signatures
+
+    @staticmethod
+    def league_data_version(league: str, signatures: Dict[str, str] | None = None) -> str:
+        """
+        Cheap fingerprint of a league's player files (name, size, mtime).
+        Changes whenever any team file is rewritten, added or removed.
+        """
+        signatures = FBRefLoaderService.league_file_signatures(league) if signatures is None else signatures
+        if not signatures:
+            return ""
+        h = hashlib.sha1()
+        for name, sig in signatures.items():
+            h.update(f"{name}:{sig};".encode("utf-8"))
+        return h.hexdigest()[:16]
+
     @staticmethod
     def list_available_league_team_paths():
         base = Path("data/players")
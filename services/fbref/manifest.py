@@ -0,0 +1,39 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from services.fbref.league.fbref_utils import _atomic_write_json, _safe_name
+
+MANIFEST_DIR = Path("data/manifests")
+
+
+def payload_hash(payload: Any) -> str:
+    """Stable content hash of a JSON-ready payload (key order independent)."""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TeamManifest:
+    """
+    Per-league {team: content hash} record stored under data/manifests/<kind>/<league>.json,
+    kept outside data/players so the loaders' *.json globs never pick it up.
+    """
+
+    def __init__(self, kind: str, league: str):
+        self.path = MANIFEST_DIR / kind / f"{_safe_name(league)}.json"
+        self.hashes: Dict[str, str] = {}
+        if self.path.exists():
+            self.hashes = json.loads(self.path.read_text(encoding="utf-8")).get("teams", {})
+
+    def get(self, team: str) -> Optional[str]:
+        return self.hashes.get(team)
+
+    def is_changed(self, team: str, digest: str) -> bool:
+        return self.hashes.get(team) != digest
+
+    def update(self, team: str, digest: str) -> None:
+        self.hashes[team] = digest
+
+    def save(self) -> None:
+        _atomic_write_json(self.path, {"teams": dict(sorted(self.hashes.items()))})
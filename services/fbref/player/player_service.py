@@ -1,78 +1,90 @@
 from __future__ import annotations
 import logging
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 from soccerdata import FBref
 
-from models.fbref.fbref_types import IDENTITY_COLS, POSSIBLE_PLAYER_TABLES
+from models.fbref.fbref_types import IDENTITY_COLS
 from services.fbref.league.fbref_utils import (
     _atomic_write_json,
     _safe_name,
     _sanitize,
     _sanitize_value,
 )
+from services.fbref.manifest import TeamManifest, payload_hash
+from services.fbref.player.utils import FBrefTableReader
 
 log = logging.getLogger(__name__)
 
 
 class FBRefPlayerService:
-    def __init__(self, league: str, season: str):
+    def __init__(self, league: str, season: str, reader: Optional[FBrefTableReader] = None):
         self.league = league
         self.season = season
-        self.fbref = FBref(leagues=[league], seasons=[season])
+        self.reader = reader or FBrefTableReader(FBref(leagues=[league], seasons=[season]), league, season)
+        self.fbref = self.reader.fb
         self.base_dir = Path("data/players") / _safe_name(league)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         log.info("FBRefPlayerService initialized for %s / %s", league, season)
 
-    def build_team_jsons(self):
+    def build_team_jsons(self, force: bool = False):
+        """
+        Build every team file, but only write teams whose normalized payload hash
+        differs from the manifest (or whose file is missing). force=True rewrites all.
+        Usually runs in a build worker process, so announcing "changed" is the caller's
+        job (build_runner.publish_changes).
+        """
         table_frames = self._load_all_stat_tables()
         teams = self._get_all_teams()
+        players_by_team = self._build_league_players(table_frames)
+        manifest = TeamManifest("players", self.league)
 
-        saved = 0
+        changed: List[str] = []
+        unchanged: List[str] = []
         for team in teams:
-            players = self._build_team_players(team, table_frames)
-            self._merge_keeper_stats(players, table_frames, team)
+            players = players_by_team.get(team.casefold(), [])
 
             if not players:
                 log.warning("No players for team: %s", team)
                 continue
 
-            team_data = {
+            team_data = _sanitize({
                 "league": self.league,
                 "season": self.season,
                 "team": team,
                 "players": players,
-            }
+            })
 
             out = self.base_dir / f"{_safe_name(team)}.json"
-            _atomic_write_json(out, _sanitize(team_data))
+            digest = payload_hash(team_data)
+            if not force and out.exists() and not manifest.is_changed(team, digest):
+                unchanged.append(team)
+                continue
+
+            _atomic_write_json(out, team_data)
+            manifest.update(team, digest)
             log.info("Saved %d players → %s", len(players), out)
-            saved += 1
+            changed.append(team)
 
-        return {"ok": True, "teams_written": saved}
+        manifest.save()
+        return {"ok": True, "teams_written": len(changed), "changed": changed, "unchanged": unchanged}
 
     def _load_all_stat_tables(self) -> Dict[str, pd.DataFrame]:
         frames = {}
-        for stat in POSSIBLE_PLAYER_TABLES:
-            try:
-                df = self.fbref.read_player_season_stats(stat_type=stat)
-                if df is None or df.empty:
-                    continue
-
-                df = df.reset_index()
-                df = self._flatten_columns(df)
-                df = df.loc[:, ~df.columns.duplicated()]
-
-                frames[stat] = df
-                log.info("Loaded %s: shape=%s", stat, df.shape)
-            except Exception as e:
-                log.warning("Failed stat %s: %s", stat, e)
+        for stat in self.reader.available():
+            df = self.reader.read(stat).reset_index()
+            df = self._flatten_columns(df)
+            df = df.loc[:, ~df.columns.duplicated()]
+
+            frames[stat] = df
+            log.info("Loaded %s: shape=%s", stat, df.shape)
+        self.reader.save()
         return frames
 
     def _get_all_teams(self) -> List[str]:
-        df = self.fbref.read_team_season_stats(stat_type="standard", opponent_stats=False)
+        df = self.reader.read_team("standard")
         if df is None or df.empty:
             raise RuntimeError("No team data loaded from FBref.")
 
@@ -81,80 +93,83 @@ class FBRefPlayerService:
 
         raise RuntimeError(f"Team index names: {df.index.names}; columns: {df.columns}")
 
-    def _build_team_players(self, team: str, table_frames: Dict[str, pd.DataFrame]) -> List[Dict]:
-        players: Dict[str, Dict] = {}
-
+    @staticmethod
+    def _keyed_table(stat: str, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        Normalize team keys and player names once and index the table by (team_key, name).
+        Returns a frame with identity columns plus one stats record per player.
+        """
+        team_col = "team" if "team" in df.columns else "squad"
+        if team_col not in df.columns or "player" not in df.columns:
+            log.warning(f"Skipping {stat} — missing team/player col")
+            return None
+
+        names = df["player"].astype(str).str.split("\n").str[0].str.strip()
+        keys = df[team_col].str.casefold()
+        metric_cols = [c for c in df.columns if c not in IDENTITY_COLS]
+
+        keyed = pd.DataFrame(
+            {
+                "age": df["age"] if "age" in df.columns else None,
+                "position": df["pos"] if "pos" in df.columns else None,
+                "stats": df[metric_cols].to_dict("records"),
+            },
+            index=df.index,
+        )
+        keyed.index = pd.MultiIndex.from_arrays([keys, names], names=["team_key", "name"])
+        return keyed[(names != "").to_numpy() & keys.notna().to_numpy()]
+
+    def _build_league_players(self, table_frames: Dict[str, pd.DataFrame]) -> Dict[str, List[Dict]]:
+        """Join every stat table on (team_key, name) and emit all teams' player lists in one pass."""
+        field_tables: Dict[str, pd.DataFrame] = {}
+        keeper_tables: Dict[str, pd.DataFrame] = {}
         for stat, df in table_frames.items():
-            if stat in ("keeper", "keeper_adv"):
-                continue  # handled separately
-
-            team_col = "team" if "team" in df.columns else "squad"
-            if team_col not in df.columns or "player" not in df.columns:
-                log.warning(f"Skipping {stat} — missing team/player col")
-                continue
-
-            team_df = df[df[team_col].str.casefold() == team.casefold()]
-
-            for _, row in team_df.iterrows():
-                name_raw = row.get("player")
-                name = (
-                    name_raw.item()
-                    if hasattr(name_raw, "item")
-                    else str(name_raw).split("\n")[0].strip()
-                )
-                if not name:
-                    continue
-
-                rec = players.setdefault(
-                    name,
-                    {
-                        "name": name,
-                        "age": _sanitize_value(row.get("age")),
-                        "position": row.get("pos"),
-                        "stats": {},
-                    },
-                )
-
-                rec["stats"][stat] = {
-                    str(k): self._safe_json_value(v)
-                    for k, v in row.items()
-                    if k not in IDENTITY_COLS
-                }
-
-        return list(players.values())
-
-    def _merge_keeper_stats(self, players: List[Dict], table_frames: Dict[str, pd.DataFrame], team: str):
-        keeper_data = {}
-        for stat in ("keeper", "keeper_adv"):
-            df = table_frames.get(stat)
-            if df is None or df.empty:
+            keyed = self._keyed_table(stat, df)
+            if keyed is None:
                 continue
-
-            df = self._flatten_columns(df)
-            df = df[df.get("team", df.get("squad", "")).str.casefold() == team.casefold()]
-
-            for _, row in df.iterrows():
-                name_raw = row.get("player")
-                name = (
-                    name_raw.item()
-                    if hasattr(name_raw, "item")
-                    else str(name_raw).split("\n")[0].strip()
-                )
-                if not name:
-                    continue
-
-                keeper_data.setdefault(name, {})[stat] = {
-                    str(k): self._safe_json_value(v)
-                    for k, v in row.items()
-                    if k not in IDENTITY_COLS
-                }
-
-        for player in players:
-            pos = player.get("position")
-            if pos is not None and isinstance(pos, str) and pos == "GK":
-                pdata = keeper_data.get(player["name"])
-                if pdata:
-                    player["stats"].update(pdata)
+            target = keeper_tables if stat in ("keeper", "keeper_adv") else field_tables
+            target[stat] = keyed
+
+        if not field_tables:
+            return {}
+
+        # player-keyed join: one column per stat table, outer join keeps first-seen order
+        stats = pd.concat(
+            {stat: t["stats"][~t.index.duplicated(keep="last")] for stat, t in field_tables.items()},
+            axis=1,
+            sort=False,
+        )
+        identity = pd.concat([t[["age", "position"]] for t in field_tables.values()])
+        identity = identity[~identity.index.duplicated(keep="first")].reindex(stats.index)
+
+        keepers = pd.DataFrame(index=stats.index)
+        for stat, t in keeper_tables.items():
+            keepers[stat] = t["stats"][~t.index.duplicated(keep="last")].reindex(stats.index)
+
+        stat_names = list(stats.columns)
+        keeper_names = list(keepers.columns)
+        keeper_rows = keepers.itertuples(index=False, name=None) if keeper_names else [()] * len(keepers)
+        players_by_team: Dict[str, List[Dict]] = {}
+
+        for (team_key, name), age, position, stat_recs, keeper_recs in zip(
+            stats.index,
+            identity["age"].tolist(),
+            identity["position"].tolist(),
+            stats.itertuples(index=False, name=None),
+            keeper_rows,
+        ):
+            player_stats = {s: rec for s, rec in zip(stat_names, stat_recs) if isinstance(rec, dict)}
+            if position == "GK":
+                player_stats.update({s: rec for s, rec in zip(keeper_names, keeper_recs) if isinstance(rec, dict)})
+
+            players_by_team.setdefault(team_key, []).append({
+                "name": name,
+                "age": _sanitize_value(age),
+                "position": position,
+                "stats": player_stats,
+            })
+
+        return players_by_team
 
     @staticmethod
     def _flatten_columns(df: pd.DataFrame) -> pd.DataFrame:
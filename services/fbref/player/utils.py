@@ -1,9 +1,16 @@
+import json
+import logging
 import re
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional
 import pandas as pd
 from soccerdata import FBref
 from models.fbref.fbref_types import POSSIBLE_PLAYER_TABLES
+from services.fbref.league.fbref_utils import _atomic_write_json, _safe_name
 
+log = logging.getLogger(__name__)
+
+CAPABILITIES_DIR = Path("data/fbref/table_capabilities")
 
 
 def _norm_col(c: str) -> str:
@@ -32,24 +39,10 @@ def _clean_df(df: pd.DataFrame, league: str, season: int) -> pd.DataFrame:
         df["team"] = df["team"].astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
     return df
 
-def _available_tables(fb: FBref) -> List[str]:
-    out = []
-    for t in POSSIBLE_PLAYER_TABLES:
-        # prefer generic reader signature: read_player_season_stats(stat_type=...)
-        try:
-            _ = fb.read_player_season_stats(stat_type=t)
-            out.append(t)
-            continue
-        except AttributeError:
-            pass
-        # fallback to specific helpers some versions expose: read_players_{t}()
-        try:
-            _ = getattr(fb, f"read_players_{t}")()
-            out.append(t)
-        except AttributeError:
-            # not available in this lib version
-            pass
-    return out
+def _available_tables(fb: FBref, reader: Optional["FBrefTableReader"] = None) -> List[str]:
+    """Tables that exist for this reader; discovery keeps the frames it loads for reuse."""
+    reader = reader or FBrefTableReader(fb)
+    return reader.available()
 
 def _read_table(fb: FBref, table: str) -> pd.DataFrame:
     try:
@@ -75,3 +68,67 @@ def _discover_teams(table_frames: Dict[str, pd.DataFrame]) -> list[str]:
 
 
 
+
+
+
+class FBrefTableReader:
+    """
+    Read-through cache over one FBref league/season.
+    Every DataFrame is read at most once, and which player tables exist is persisted
+    to CAPABILITIES_DIR/<league>-<season>.json so later runs never re-probe tables
+    known to be missing. One file per league/season: parallel build workers each
+    write only their own, so no read-modify-write of a shared file.
+    """
+
+    def __init__(self, fb: FBref, league: Optional[str] = None, season: Optional[str] = None):
+        self.fb = fb
+        self.path = CAPABILITIES_DIR / f"{_safe_name(league)}-{season}.json" if league else None
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.team_frames: Dict[str, pd.DataFrame] = {}
+        self.capabilities: Dict[str, bool] = self._load_capabilities()
+
+    def _load_capabilities(self) -> Dict[str, bool]:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return {}
+
+    def read(self, table: str) -> Optional[pd.DataFrame]:
+        """Player season table, or None if it does not exist for this league/season."""
+        if table in self.frames:
+            return self.frames[table]
+        if self.capabilities.get(table) is False:
+            return None
+
+        try:
+            df = _read_table(self.fb, table)
+        except AttributeError:
+            # not available in this lib version
+            df = None
+        except Exception as e:
+            # transient (network / parse) failure: don't record it as missing
+            log.warning("Failed stat %s: %s", table, e)
+            return None
+
+        if df is None or df.empty:
+            self.capabilities[table] = False
+            return None
+
+        self.capabilities[table] = True
+        self.frames[table] = df
+        return df
+
+    def read_team(self, stat_type: str = "standard") -> Optional[pd.DataFrame]:
+        if stat_type not in self.team_frames:
+            self.team_frames[stat_type] = self.fb.read_team_season_stats(stat_type=stat_type, opponent_stats=False)
+        return self.team_frames[stat_type]
+
+    def available(self) -> List[str]:
+        return [t for t in POSSIBLE_PLAYER_TABLES if self.read(t) is not None]
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        _atomic_write_json(self.path, {t: self.capabilities[t] for t in POSSIBLE_PLAYER_TABLES if t in self.capabilities})
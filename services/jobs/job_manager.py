@@ -0,0 +1,223 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from core.config import settings
+from services.fbref.build_runner import DEFAULT_LEAGUES, DEFAULT_SEASONS
+
+log = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# ------------------ Job kinds ------------------
+def _build_job(job: "Job") -> Dict[str, Any]:
+    from services.fbref.build_runner import build_leagues
+
+    # process pool, last_build.json summary and change events, same as the CLI build
+    summary = build_leagues(job.leagues, job.seasons, progress=False)
+    if not summary["ok"]:
+        failed = [f"{r['league']} {r['season']}" for r in summary["results"] if not r["ok"]]
+        raise RuntimeError(f"build failed for {failed}; see /players/build/summary")
+    return summary
+
+
+def _rank_job(job: "Job") -> Dict[str, Any]:
+    from services.ranking.player_ranking_service import FBRefPlayerRankingService
+
+    FBRefPlayerRankingService(job.league).rank_players()
+    return {"league": job.league}
+
+
+def _render_job(job: "Job") -> Dict[str, Any]:
+    from services.pipeline.ingest_pipeline import STAGES, IngestPipeline
+
+    return IngestPipeline(job.league, job.season, skip=[s for s in STAGES if s != "render"]).run()
+
+
+def _refresh_job(job: "Job") -> Dict[str, Any]:
+    from services.pipeline.ingest_pipeline import IngestPipeline
+
+    return IngestPipeline(job.league, job.season).run()
+
+
+JOB_KINDS: Dict[str, Callable[["Job"], Dict[str, Any]]] = {
+    "build": _build_job,
+    "rank": _rank_job,
+    "render": _render_job,
+    "refresh": _refresh_job,
+}
+
+
+@dataclass
+class Job:
+    kind: str
+    league: str
+    season: str
+    leagues: List[str] = field(default_factory=list)  # every league the job writes; [league] by default
+    seasons: List[str] = field(default_factory=list)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    created_at: str = field(default_factory=_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    wait_seconds: Optional[float] = None
+    run_seconds: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        self.leagues = self.leagues or [self.league]
+        self.seasons = self.seasons or [self.season]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobManager:
+    """
+    Runs build/rank/render/refresh jobs on a bounded thread pool.
+    At most one job touches a league's files at a time: a job is handed to the pool
+    only once all its leagues are idle, and a league's jobs start in submit order.
+    Jobs for a busy league stay "queued" without holding a worker.
+    """
+
+    def __init__(self, max_workers: int = settings.JOB_WORKERS, history: int = settings.JOB_HISTORY):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.history = history
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pending: List[Job] = []
+        self._busy: Set[str] = set()
+        self._queued_at: Dict[str, float] = {}
+        self.scheduler: Optional[BackgroundScheduler] = None
+
+    # ---- submit / query ----
+    def submit(self, kind: str, league: str, season: str = DEFAULT_SEASONS[0]) -> Job:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'. Expected one of {sorted(JOB_KINDS)}")
+
+        return self._enqueue(Job(kind=kind, league=league, season=str(season)))
+
+    def submit_build(self, leagues: Sequence[str], seasons: Sequence[str]) -> Job:
+        """One build job over many leagues/seasons (build_leagues runs them across a process pool)."""
+        leagues, seasons = list(leagues), [str(s) for s in seasons]
+        return self._enqueue(
+            Job(kind="build", league=", ".join(leagues), season=", ".join(seasons), leagues=leagues, seasons=seasons)
+        )
+
+    def _enqueue(self, job: Job) -> Job:
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+            self._pending.append(job)
+            self._queued_at[job.id] = time.perf_counter()
+            ready = self._take_ready()
+        self._dispatch(ready)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self, status: Optional[str] = None, league: Optional[str] = None) -> List[Job]:
+        jobs = list(self.jobs.values())
+        return [
+            j for j in reversed(jobs)
+            if (status is None or j.status == status) and (league is None or league in j.leagues)
+        ]
+
+    # ---- execution ----
+    def _take_ready(self) -> List[Job]:
+        """Pop pending jobs whose leagues are all idle and mark those leagues busy. Caller holds _lock."""
+        ready: List[Job] = []
+        blocked: Set[str] = set()  # leagues of older jobs still waiting keep their place in line
+        for job in list(self._pending):
+            leagues = set(job.leagues)
+            if leagues & (self._busy | blocked):
+                blocked |= leagues
+                continue
+            self._pending.remove(job)
+            self._busy |= leagues
+            ready.append(job)
+        return ready
+
+    def _dispatch(self, jobs: List[Job]) -> None:
+        for job in jobs:
+            try:
+                self.pool.submit(self._run, job)
+            except RuntimeError:  # pool shut down
+                log.warning("job %s not started: manager is shutting down", job.id)
+
+    def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = _now()
+        job.wait_seconds = round(time.perf_counter() - self._queued_at.pop(job.id, time.perf_counter()), 3)
+        start = time.perf_counter()
+        try:
+            job.result = JOB_KINDS[job.kind](job)
+            job.status = SUCCEEDED
+        except Exception as e:
+            log.exception("job %s (%s %s) failed", job.id, job.kind, job.league)
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.run_seconds = round(time.perf_counter() - start, 3)
+            job.finished_at = _now()
+            with self._lock:
+                self._busy -= set(job.leagues)
+                ready = self._take_ready()
+            self._dispatch(ready)
+
+    def _prune(self) -> None:
+        """Drop the oldest finished jobs beyond the history limit (dicts keep insertion order)."""
+        finished = [jid for jid, j in self.jobs.items() if j.status in (SUCCEEDED, FAILED)]
+        for jid in finished[: max(0, len(finished) - self.history)]:
+            del self.jobs[jid]
+
+    # ---- periodic refresh ----
+    def schedule_refresh(self) -> List[Job]:
+        """Submit a full refresh job for every default league/season."""
+        return [self.submit("refresh", league, season) for season in DEFAULT_SEASONS for league in DEFAULT_LEAGUES]
+
+    def start(self) -> None:
+        if self.scheduler or not settings.REFRESH_CRON:
+            return
+        self.scheduler = BackgroundScheduler(timezone=settings.TZ)
+        self.scheduler.add_job(
+            self.schedule_refresh,
+            CronTrigger.from_crontab(settings.REFRESH_CRON, timezone=settings.TZ),
+            id="refresh",
+            max_instances=1,
+            coalesce=True,
+        )
+        self.scheduler.start()
+        log.info("refresh scheduled: %s (%s)", settings.REFRESH_CRON, settings.TZ)
+
+    def next_refresh(self) -> Optional[str]:
+        job = self.scheduler.get_job("refresh") if self.scheduler else None
+        return job.next_run_time.isoformat() if job and job.next_run_time else None
+
+    def shutdown(self) -> None:
+        if self.scheduler:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_job_manager() -> JobManager:
+    return JobManager()
@@ -1,5 +1,11 @@
+import heapq
+import json
 from collections import defaultdict
-from typing import List, Dict, DefaultDict, Set
+from pathlib import Path
+from math import isfinite
+from typing import Collection, Iterable, List, Dict, DefaultDict, Optional, Set, Tuple
+import numpy as np
+from scipy.optimize import linear_sum_assignment
 from services.plotting.plotting_service import BestXIPlotter
 
 # ====== Constants ======
@@ -10,6 +16,7 @@ LINES = {
     "DEF" : {
         "CB": {"min": 2, "max": 3, "roles": ["CB", "LCB", "RCB"]},
         "FB": {"min": 2, "max": 2, "roles": ["FB", "LB", "RB"]},
+        "WB": {"min": 2, "max": 2, "roles": ["RWB", "LWB", "WB", "FB", "LB", "RB"]},
     },
     "MID" : {
         "DM": {"min": 1, "max": 4, "roles": ["DM", "CDM", "LDM", "RDM"]},
@@ -22,7 +29,7 @@ LINES = {
     }
 }
 
-FORMATIONS = {
+DEFAULT_FORMATIONS = {
     "433": {
         "GK": {"GK": 1},
         "DEF": {"CB": 2, "FB": 2},
@@ -43,6 +50,40 @@ FORMATIONS = {
     }
 }
 
+FORMATIONS_FILE = Path("data/formations/formations.json")
+
+
+def validate_formation(name: str, formation: Dict) -> None:
+    """Raise ValueError unless every line/subline exists in LINES, counts respect min/max and spots add to 11."""
+    total = 0
+    for line_name, formation_line in formation.items():
+        if line_name not in LINES:
+            raise ValueError(f"Formation {name}: unknown line '{line_name}'")
+        for sub, count in formation_line.items():
+            if sub == "no_order":
+                continue
+            sub_def = LINES[line_name].get(sub)
+            if sub_def is None:
+                raise ValueError(f"Formation {name}: unknown subline '{line_name}.{sub}'")
+            if not sub_def["min"] <= count <= sub_def["max"]:
+                raise ValueError(f"Formation {name}: {line_name}.{sub}={count} outside {sub_def['min']}-{sub_def['max']}")
+            total += count
+    if total != 11:
+        raise ValueError(f"Formation {name}: {total} spots, expected 11")
+
+
+def load_formations(path: Path = FORMATIONS_FILE) -> Dict[str, Dict]:
+    """Formation registry from data/formations/formations.json; the built-in three when the file is missing."""
+    if not path.exists():
+        return dict(DEFAULT_FORMATIONS)
+    formations = json.loads(path.read_text(encoding="utf-8"))["formations"]
+    for name, formation in formations.items():
+        validate_formation(name, formation)
+    return formations
+
+
+FORMATIONS = load_formations()
+
 ROLE_CATEGORY_MAP = {
     "GK": "GK",
     "CB": "CB", "LCB": "CB", "RCB": "CB",
@@ -54,13 +95,141 @@ ROLE_CATEGORY_MAP = {
     "CF": "CF", "ST": "CF"
 }
 
+UNFILLED_COST = 1e9  # cost of putting an ineligible player in a slot (= leaving it empty)
+
+
+def player_value(p: Dict, key_type: str = "mental") -> float:
+    """
+    Score a player brings to a slot: mental m_raw or ranking performance.
+    Missing/invalid -> -inf, so unscored players order below every scored one.
+    """
+    if key_type == "mental":
+        v = (p.get("mental") or {}).get("m_raw")
+    else:
+        v = (p.get("ranking") or {}).get("performance")
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return float("-inf")
+    return v if isfinite(v) else float("-inf")
+
+
+def solver_values(values: np.ndarray) -> np.ndarray:
+    """values for cost matrices and bounds: -inf becomes a finite floor just below the lowest real score."""
+    finite = np.isfinite(values)
+    if finite.all():
+        return values
+    floor = (values[finite].min() if finite.any() else 0.0) - 1.0
+    return np.where(finite, values, floor)
+
+
+def slot_roles(line_name: str, subline: Optional[str]) -> List[str]:
+    """Roles that may fill a slot; subline None is a no_order slot open to the whole line."""
+    if subline is None:
+        return [r for sub_def in LINES[line_name].values() for r in sub_def["roles"]]
+    return LINES[line_name][subline]["roles"]
+
+
+def formation_slots(formation_name: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    One (line, subline) entry per starting spot. no_order lines pool their spots
+    (subline None): any role of the line may take them.
+    """
+    slots = []
+    for line_name, formation_line in FORMATIONS[formation_name].items():
+        sublines = [(k, v) for k, v in formation_line.items() if k != "no_order"]
+        if formation_line.get("no_order"):
+            slots.extend([(line_name, None)] * sum(v for _, v in sublines))
+        else:
+            slots.extend((line_name, k) for k, v in sublines for _ in range(v))
+    return slots
+
+
+# ====== Candidate index ======
+class RoleCandidateIndex:
+    """
+    Player indexes presorted by value, per role, built once per key type.
+    top() merges the presorted lists of the asked roles and stops after `limit`
+    unused players, so picking candidates costs O(limit) instead of a scan + sort.
+    Ties keep the input order (same as a stable sort).
+    """
+
+    def __init__(self, players: List[Dict]):
+        self.players = players
+        self._values: Dict[str, np.ndarray] = {}
+        self._solver_values: Dict[str, np.ndarray] = {}
+        self._rank: Dict[str, np.ndarray] = {}
+        self._by_role: Dict[str, Dict[str, List[int]]] = {}
+        self._by_name: DefaultDict[str, List[int]] = defaultdict(list)
+        for i, p in enumerate(players):
+            self._by_name[p.get("name")].append(i)
+
+    def _build(self, key_type: str) -> None:
+        values = np.array([player_value(p, key_type) for p in self.players], dtype=float)
+        order = np.argsort(-values, kind="stable")
+        rank = np.empty(len(order), dtype=int)
+        rank[order] = np.arange(len(order))
+
+        by_role: DefaultDict[str, List[int]] = defaultdict(list)
+        for i in order.tolist():
+            by_role[self.players[i].get("role")].append(i)
+        self._values[key_type], self._rank[key_type], self._by_role[key_type] = values, rank, dict(by_role)
+
+    def values(self, key_type: str = "mental") -> np.ndarray:
+        if key_type not in self._values:
+            self._build(key_type)
+        return self._values[key_type]
+
+    def solver_values(self, key_type: str = "mental") -> np.ndarray:
+        if key_type not in self._solver_values:
+            self._solver_values[key_type] = solver_values(self.values(key_type))
+        return self._solver_values[key_type]
+
+    def same_name(self, indexes: Iterable[int]) -> Set[int]:
+        """Every index sharing a name with one of indexes (a player listed for two clubs)."""
+        return {j for i in indexes for j in self._by_name[self.players[i].get("name")]}
+
+    def top(
+        self,
+        roles: Optional[Iterable[str]],
+        limit: int,
+        key_type: str = "mental",
+        used: Collection[int] = (),
+    ) -> List[int]:
+        """Best `limit` player indexes among roles (None = every player), skipping used."""
+        if key_type not in self._values:
+            self._build(key_type)
+        if roles is None:
+            merged = iter(np.argsort(self._rank[key_type]).tolist())
+        else:
+            by_role, rank = self._by_role[key_type], self._rank[key_type]
+            lists = [by_role[r] for r in dict.fromkeys(roles) if r in by_role]
+            merged = lists[0] if len(lists) == 1 else heapq.merge(*lists, key=rank.__getitem__)
+
+        out = []
+        if limit <= 0:
+            return out
+        for i in merged:
+            if i in used:
+                continue
+            out.append(i)
+            if len(out) == limit:
+                break
+        return out
+
+
 # ====== Builder ======
 class BestXIBuilder:
-    def __init__(self, players: List[Dict]):
+    def __init__(self, players: List[Dict], index: Optional[RoleCandidateIndex] = None):
         self.players = [p for p in players if p.get("role") in ROLE_CATEGORY_MAP and p.get("role") != "NA"]
         self.unknown_roles = [p for p in players if p.get("role") not in ROLE_CATEGORY_MAP or p.get("role") == "NA"]
         for p in self.unknown_roles:
             print(f"[WARN] Player {p['name']} has unknown role '{p.get('role')}'")
+        # One index over the whole pool: solving only asks for known roles, subs may use anyone.
+        self.index = index or RoleCandidateIndex(players)
+        self.known_roles = [r for r in ROLE_CATEGORY_MAP if r != "NA"]
+        self._solved: Dict[Tuple[str, str], List[int]] = {}
+        self._eligible_memo: Dict[Tuple, List[int]] = {}
 
     @staticmethod
     def _sort_players(players: List[Dict], key_type: str = "mental") -> List[Dict]:
@@ -70,33 +239,86 @@ class BestXIBuilder:
             return sorted(players, key=lambda p: p.get("ranking", {}).get("performance", 0), reverse=True)
         return players
 
-    def _pick_subline(self, subline_def: Dict, used_names: Set[str], spots: int, key_type="mental") -> List[Dict]:
-        candidates = [p for p in self.players if p["role"] in subline_def["roles"] and p["name"] not in used_names]
-        candidates = self._sort_players(candidates, key_type)
-        take = min(spots, len(candidates))
-        picked = candidates[:take]
-        used_names.update(p["name"] for p in picked)
-        return picked
-
-    def _pick_line(self, line_def: Dict, formation_line: Dict, used_names: Set[str], key_type="mental") -> List[Dict]:
-        picked = []
-        no_order = formation_line.get("no_order", False)
-        if no_order:
-            total_spots = sum(formation_line[k] for k in formation_line if k != "no_order")
-            all_roles = []
-            for sub_def in line_def.values():
-                all_roles.extend(sub_def["roles"])
-            candidates = [p for p in self.players if p["role"] in all_roles and p["name"] not in used_names]
-            candidates = self._sort_players(candidates, key_type)
-            picked = candidates[:total_spots]
-            used_names.update(p["name"] for p in picked)
-        else:
-            for sub_name, spots in formation_line.items():
-                if sub_name == "no_order":
-                    continue
-                sub_def = line_def[sub_name]
-                picked.extend(self._pick_subline(sub_def, used_names, spots, key_type))
-        return picked
+    def _eligible(self, roles: List[str], key_type: str, limit: int, excluded: Collection[int] = ()) -> List[int]:
+        """Indexes of the best `limit` known-role players whose role is in roles (shared across formations)."""
+        key = (tuple(roles), key_type, limit)
+        if not excluded and key in self._eligible_memo:
+            return self._eligible_memo[key]
+        idx = self.index.top([r for r in roles if r in ROLE_CATEGORY_MAP and r != "NA"], limit, key_type, used=excluded)
+        if not excluded:
+            self._eligible_memo[key] = idx
+        return idx
+
+    def _assign(self, slots: List[Tuple[str, Optional[str]]], key_type: str, excluded: Collection[int] = ()) -> List[Tuple[int, int]]:
+        """
+        Optimal slot -> player assignment (Hungarian). Only the top len(slots) players per
+        slot type can appear in an optimal XI, so candidates are pruned to those first.
+        Returns [(slot index, player index)]; slots nobody eligible can fill are left out.
+        """
+        values = self.index.solver_values(key_type)
+        eligible = {
+            slot: self._eligible(slot_roles(*slot), key_type, len(slots), excluded)
+            for slot in dict.fromkeys(slots)
+        }
+        candidates = sorted({i for idx in eligible.values() for i in idx})
+        if not candidates:
+            return []
+
+        col = {i: c for c, i in enumerate(candidates)}
+        cost = np.full((len(slots), len(candidates)), UNFILLED_COST)
+        for r, slot in enumerate(slots):
+            for i in eligible[slot]:
+                cost[r, col[i]] = -values[i]
+
+        rows, cols = linear_sum_assignment(cost)
+        return [(r, candidates[c]) for r, c in zip(rows, cols) if cost[r, c] < UNFILLED_COST]
+
+    def solve_indexes(self, formation_name: str, key_type: str = "mental") -> List[int]:
+        """Index-pool positions of the best XI, ordered by line (no_order lines by value). Memoized."""
+        key = (formation_name, key_type)
+        if key not in self._solved:
+            self._solved[key] = self._solve(formation_name, key_type)
+        return list(self._solved[key])
+
+    def _solve(self, formation_name: str, key_type: str) -> List[int]:
+        values = self.index.values(key_type)
+        slots = formation_slots(formation_name)
+
+        # A name picked twice (two club entries) keeps its best entry; the rest are excluded and re-solved.
+        excluded: Set[int] = set()
+        while True:
+            by_slot = dict(self._assign(slots, key_type, excluded))
+            seen: Set[str] = set()
+            duplicates = set()
+            for i in sorted(by_slot.values(), key=lambda i: values[i], reverse=True):
+                name = self.index.players[i].get("name")
+                if name in seen:
+                    duplicates.add(i)
+                seen.add(name)
+            if not duplicates:
+                break
+            excluded |= duplicates
+
+        xi = []
+        for line_name, formation_line in FORMATIONS[formation_name].items():
+            line = [by_slot[r] for r, slot in enumerate(slots) if slot[0] == line_name and r in by_slot]
+            if formation_line.get("no_order"):
+                line.sort(key=lambda i: values[i], reverse=True)
+            xi.extend(line)
+        return xi
+
+    def solve_formation(self, formation_name: str, key_type: str = "mental") -> List[Dict]:
+        """
+        Best XI for a formation as an assignment problem: maximizes the summed value
+        (mental m_raw or performance) over all slots at once instead of line by line.
+        """
+        return [self.index.players[i] for i in self.solve_indexes(formation_name, key_type)]
+
+    def substitutes(self, starting: List[int], key_type: str = "mental", limit: int = 7, any_role: bool = False) -> List[Dict]:
+        """Next best `limit` players not in the starting XI (known roles only unless any_role)."""
+        roles = None if any_role else self.known_roles
+        used = self.index.same_name(starting)
+        return [self.index.players[i] for i in self.index.top(roles, limit, key_type, used=used)]
 
     def _minimal_player(self, p: Dict) -> Dict:
         """Return a minimal cleaned player dictionary for best XI outputs."""
@@ -116,28 +338,14 @@ class BestXIBuilder:
 
     def build_formation(self, formation_name: str) -> Dict:
         formation_def = FORMATIONS[formation_name]
-        used_names = set()
-        starting_11 = []
+        starting_idx = self.solve_indexes(formation_name, key_type="mental")
+        starting_11 = [self.index.players[i] for i in starting_idx]
 
-        for line_name, formation_line in formation_def.items():
-            line_def = LINES[line_name]
-            starting_11.extend(
-                self._pick_line(line_def, formation_line, used_names, key_type="mental")
-            )
-
-        # Substitutes: pick next best remaining per category
-        remaining_players = [p for p in self.players if p["name"] not in used_names]
-        subs = self._sort_players(remaining_players, "mental")[:7]  # top 7 subs
-        used_names.update(p["name"] for p in subs)
+        # Substitutes: next best remaining by mental score
+        subs = self.substitutes(starting_idx, "mental", limit=7)
 
         # Performance-based XI
-        perf_used_names = set()
-        best_perf_11 = []
-        for line_name, formation_line in formation_def.items():
-            line_def = LINES[line_name]
-            best_perf_11.extend(
-                self._pick_line(line_def, formation_line, perf_used_names, key_type="performance")
-            )
+        best_perf_11 = self.solve_formation(formation_name, key_type="performance")
 
         return {
             "name": formation_name,
@@ -148,10 +356,26 @@ class BestXIBuilder:
             "best_performing_eleven": [self._minimal_player(p) for p in best_perf_11],
         }
 
+    def evaluate_formations(self, names: Optional[List[str]] = None, key_type: str = "mental") -> List[Tuple[str, float]]:
+        """
+        (formation, summed value of its best XI), best first. Formations share the index and
+        the per-slot candidate lists, so each extra formation only adds a small assignment solve.
+        """
+        values = self.index.values(key_type)
+        # missing values count as 0, like the "score" of a built formation
+        scored = [
+            (name, float(sum(values[i] for i in self.solve_indexes(name, key_type) if isfinite(values[i]))))
+            for name in (names or FORMATIONS)
+        ]
+        scored.sort(key=lambda r: r[1], reverse=True)
+        return scored
+
     def build_best_formations(self, top_n=3) -> List[Dict]:
-        results = [self.build_formation(fname) for fname in FORMATIONS.keys()]
+        # Rank every formation by its mental XI; build subs/performance XI only for the top ones
+        ranked = self.evaluate_formations(key_type="mental")
+        results = [self.build_formation(name) for name, _ in ranked[:top_n]]
         results.sort(key=lambda r: r["score"], reverse=True)
-        return results[:top_n]
+        return results
     @staticmethod
     def categorize_players(players: List[Dict]) -> Dict[str, List[Dict]]:
         categorized: DefaultDict[str, List[Dict]] = defaultdict(list)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from core import events
+from models.mental.mental import ROLE_AWARE_MENTAL_TRAIT_MAPPING
+from models.ranking.ranking import ROLE_RANK_MAPPING
+from services.fbref.loader import FBRefLoaderService
+from services.mental.best_11_service import FORMATIONS, LINES
+from services.mental.mental_service import ROLE_MAPPING
+
+MAX_CACHED_XIS = 128
+
+Scope = Tuple[str, ...]  # ("league", league, season) | ("team", league, season, team) | ("all", season)
+
+
+@lru_cache(maxsize=1)
+def scoring_version() -> str:
+    """Hash of everything besides player data that shapes a best XI: trait/rank mappings, roles, lines, formations."""
+    payload = json.dumps(
+        {
+            "traits": ROLE_AWARE_MENTAL_TRAIT_MAPPING,
+            "rank": ROLE_RANK_MAPPING,
+            "roles": ROLE_MAPPING,
+            "lines": LINES,
+            "formations": FORMATIONS,
+        },
+        sort_keys=True,
+        default=str,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def data_version(leagues: Iterable[str]) -> str:
+    """Combined data version of the leagues a scope reads."""
+    return "|".join(f"{league}={FBRefLoaderService.league_data_version(league)}" for league in sorted(leagues))
+
+
+class BestXICache:
+    """
+    pick_best_xi outputs (top formations, subs, best-performing eleven) per scope,
+    tagged with the data and scoring versions they were built from. A version
+    mismatch is a miss; TEAM_DATA_CHANGED drops every scope that reads the league.
+    Cached results are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_XIS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Scope, Tuple[str, str, Tuple[str, ...], Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+        events.subscribe(events.TEAM_DATA_CHANGED, self._on_team_data_changed)
+
+    def get_or_compute(self, scope: Scope, leagues: Iterable[str], compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        leagues = tuple(sorted(leagues))
+        version, scoring = data_version(leagues), scoring_version()
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry and entry[0] == version and entry[1] == scoring:
+                self._entries.move_to_end(scope)
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+
+        result = compute()
+        with self._lock:
+            self._entries[scope] = (version, scoring, leagues, result)
+            self._entries.move_to_end(scope)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, league: Optional[str] = None) -> int:
+        """Drop scopes reading league (every scope when None); returns how many were dropped."""
+        with self._lock:
+            stale = [s for s, entry in self._entries.items() if league is None or league in entry[2]]
+            for scope in stale:
+                del self._entries[scope]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "invalidations": self.invalidations,
+            "scoring_version": scoring_version(),
+        }
+
+    def _on_team_data_changed(self, payload: Dict[str, Any]) -> None:
+        if payload.get("teams"):
+            self.invalidate(payload["league"])
+
+
+@lru_cache(maxsize=1)
+def get_best_xi_cache() -> BestXICache:
+    return BestXICache()
@@ -0,0 +1,334 @@
+from __future__ import annotations
+import heapq
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from services.mental.best_11_service import (
+    FORMATIONS,
+    ROLE_CATEGORY_MAP,
+    UNFILLED_COST,
+    BestXIBuilder,
+    formation_slots,
+    slot_roles,
+)
+
+FEET = ("left", "right")
+SlotType = Tuple[str, Optional[str], Optional[str]]  # (line, subline or None for no_order, required foot)
+
+
+@dataclass
+class XIConstraints:
+    max_per_club: Optional[int] = None
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    # subline (or no_order line, e.g. "MID") -> feet that must appear there, one spot each: {"FB": ["left"]}
+    feet: Dict[str, List[str]] = field(default_factory=dict)
+    budget: Optional[float] = None
+    cost_field: str = "market_value"  # players without it are left out when a budget is set
+
+    def allows(self, player: Dict) -> bool:
+        age = player.get("age")
+        if self.min_age is not None and (not isinstance(age, (int, float)) or age < self.min_age):
+            return False
+        if self.max_age is not None and (not isinstance(age, (int, float)) or age > self.max_age):
+            return False
+        if self.budget is not None and player_cost(player, self.cost_field) is None:
+            return False
+        return True
+
+
+def player_cost(player: Dict, cost_field: str) -> Optional[float]:
+    try:
+        cost = float(player.get(cost_field))
+    except (TypeError, ValueError):
+        return None
+    return cost if np.isfinite(cost) else None
+
+
+def foot_fits(player: Dict, foot: Optional[str]) -> bool:
+    if foot is None:
+        return True
+    return (player.get("foot") or "").lower() in (foot, "both")
+
+
+class ConstrainedXISearch:
+    """
+    Best XI under side constraints (club cap, age range, foot for given spots, budget).
+
+    Slots of the same type form a group filled by a combination of its presorted
+    candidates (no permutations of identical spots). Depth-first branch-and-bound:
+    a node's upper bound is its value plus, per open group, the best still-pickable
+    candidates. With a budget, values are reduced by lam * cost (Lagrangian bound,
+    lam tuned once at the root) and candidates are tried in that order. The unconstrained assignment optimum bounds the root and is returned
+    at once when it already satisfies the constraints. When the time budget runs out
+    the incumbent is returned with the gap to the best open bound.
+    """
+
+    CHECK_EVERY = 256  # nodes between clock checks
+
+    def __init__(
+        self,
+        builder: BestXIBuilder,
+        formation_name: str,
+        key_type: str = "mental",
+        constraints: Optional[XIConstraints] = None,
+        time_budget_ms: float = 500,
+    ):
+        if formation_name not in FORMATIONS:
+            raise ValueError(f"Unknown formation '{formation_name}'")
+        self.builder = builder
+        self.formation_name = formation_name
+        self.key_type = key_type
+        self.constraints = constraints or XIConstraints()
+        self.time_budget = time_budget_ms / 1000
+
+        index = builder.index
+        self.players = index.players
+        # finite values: a missing score sits just below the pool's lowest, keeping bounds finite
+        self.values = index.solver_values(key_type)
+        self.names = [p.get("name") for p in self.players]
+        self.clubs = [(p.get("__meta__") or {}).get("team") or p.get("team") for p in self.players]
+        self.costs = [player_cost(p, self.constraints.cost_field) or 0.0 for p in self.players]
+
+        self.slots = self._typed_slots()
+        counts = Counter(self.slots)
+        groups = []
+        for slot_type, count in counts.items():
+            line, sub, foot = slot_type
+            roles = [r for r in slot_roles(line, sub) if r in ROLE_CATEGORY_MAP and r != "NA"]
+            candidates = [
+                i for i in index.top(roles, len(self.players), key_type)
+                if self.constraints.allows(self.players[i]) and foot_fits(self.players[i], foot)
+            ]
+            groups.append((slot_type, count, candidates))
+        # Most constrained groups first: fewer candidates per spot -> earlier pruning
+        groups.sort(key=lambda g: len(g[2]) / g[1])
+        self.groups = groups
+        # With a budget, candidates are ranked by value - lam * cost (lam=0 otherwise: plain value)
+        self.lam = self._budget_multiplier()
+        self.reduced = self.values - self.lam * np.asarray(self.costs, dtype=float)
+        for _, _, candidates in groups:
+            candidates.sort(key=lambda i: -self.reduced[i])
+
+    def _typed_slots(self) -> List[SlotType]:
+        slots: List[SlotType] = [(line, sub, None) for line, sub in formation_slots(self.formation_name)]
+        for key, feet in self.constraints.feet.items():
+            spots = [n for n, (line, sub, _) in enumerate(slots) if sub == key or (sub is None and line == key)]
+            if len(feet) > len(spots):
+                raise ValueError(f"{len(feet)} feet asked for '{key}' but {self.formation_name} has {len(spots)} such spots")
+            for n, foot in zip(spots, feet):
+                foot = foot.lower()
+                if foot not in FEET:
+                    raise ValueError(f"foot must be one of {FEET}")
+                slots[n] = (slots[n][0], slots[n][1], foot)
+        return slots
+
+    # ---- feasibility / bounds ----
+    def _pickable(self, i: int) -> bool:
+        if self.names[i] in self.used_names:
+            return False
+        cap = self.constraints.max_per_club
+        if cap is not None and self.club_counts[self.clubs[i]] >= cap:
+            return False
+        return self.constraints.budget is None or self.costs[i] <= self.budget_left + 1e-9
+
+    def _group_top(self, g: int, count: int, start: int = 0) -> float:
+        """Sum of the best `count` pickable reduced values of group g from position start (-inf if too few)."""
+        if count <= 0:
+            return 0.0
+        total, taken = 0.0, 0
+        candidates = self.groups[g][2]
+        for pos in range(start, len(candidates)):
+            i = candidates[pos]
+            if i in self.used or not self._pickable(i):
+                continue
+            total += self.reduced[i]
+            taken += 1
+            if taken == count:
+                return total
+        return -np.inf
+
+    def _rest_bound(self, g: int) -> float:
+        return sum(self._group_top(h, self.groups[h][1]) for h in range(g, len(self.groups)))
+
+    def _budget_multiplier(self) -> float:
+        """
+        lam >= 0 minimizing the Lagrangian bound lam * budget + sum of per-group top
+        (value - lam * cost). Any lam gives a valid bound (lam=0 is the plain one);
+        this one is the tightest at the root.
+        """
+        if self.constraints.budget is None or not self.groups:
+            return 0.0
+        arrays = [(np.array([self.values[i] for i in c]), np.array([self.costs[i] for i in c]), n) for _, n, c in self.groups]
+        if any(len(v) < n for v, _, n in arrays):
+            return 0.0
+
+        def bound(lam: float) -> float:
+            total = lam * self.constraints.budget
+            for v, c, n in arrays:
+                total += np.partition(v - lam * c, len(v) - n)[len(v) - n:].sum()
+            return total
+
+        positive = [v[c > 0] / c[c > 0] for v, c, _ in arrays if (c > 0).any()]
+        hi = max((float(r.max()) for r in positive if len(r)), default=0.0)
+        lo, hi = 0.0, max(hi, 0.0) * 2 + 1e-9
+        for _ in range(60):  # bound(lam) is convex: ternary search
+            m1, m2 = lo + (hi - lo) / 3, hi - (hi - lo) / 3
+            if bound(m1) <= bound(m2):
+                hi = m2
+            else:
+                lo = m1
+        return (lo + hi) / 2
+
+    def _budget_slack(self) -> float:
+        """lam * budget left: what the reduced values owe back to the bound."""
+        return self.lam * self.budget_left if self.lam else 0.0
+
+    def _assignment(self, weights: np.ndarray) -> Tuple[float, Optional[List[int]]]:
+        """
+        Best slot assignment by weights ignoring club/budget/name constraints:
+        (summed weight, XI), or (-inf, None) when the spots can't all be filled.
+        """
+        slot_types = [g[0] for g in self.groups for _ in range(g[1])]
+        pruned = {g[0]: heapq.nlargest(len(slot_types), g[2], key=weights.__getitem__) for g in self.groups}
+        candidates = sorted({i for idx in pruned.values() for i in idx})
+        if not candidates:
+            return -np.inf, None
+        col = {i: c for c, i in enumerate(candidates)}
+        cost = np.full((len(slot_types), len(candidates)), UNFILLED_COST)
+        for r, slot_type in enumerate(slot_types):
+            for i in pruned[slot_type]:
+                cost[r, col[i]] = -weights[i]
+        rows, cols = linear_sum_assignment(cost)
+        if len(rows) < len(slot_types) or any(cost[r, c] >= UNFILLED_COST for r, c in zip(rows, cols)):
+            return -np.inf, None
+        return float(-cost[rows, cols].sum()), [candidates[c] for c in cols]
+
+    def _satisfies(self, xi: List[int]) -> bool:
+        if len({self.names[i] for i in xi}) < len(xi):
+            return False
+        cap = self.constraints.max_per_club
+        if cap is not None and max(Counter(self.clubs[i] for i in xi).values()) > cap:
+            return False
+        budget = self.constraints.budget
+        return budget is None or sum(self.costs[i] for i in xi) <= budget + 1e-9
+
+    # ---- search ----
+    def _expired(self) -> bool:
+        self.nodes += 1
+        if self.timed_out:
+            return True
+        if self.nodes % self.CHECK_EVERY == 0 and time.perf_counter() - self.started > self.time_budget:
+            self.timed_out = True
+        return self.timed_out
+
+    def _take(self, i: int) -> None:
+        self.used.add(i)
+        self.used_names.add(self.names[i])
+        self.club_counts[self.clubs[i]] += 1
+        self.budget_left -= self.costs[i]
+        self.chosen.append(i)
+
+    def _drop(self, i: int) -> None:
+        self.used.discard(i)
+        self.used_names.discard(self.names[i])
+        self.club_counts[self.clubs[i]] -= 1
+        self.budget_left += self.costs[i]
+        self.chosen.pop()
+
+    def _fill(self, g: int, k: int, start: int, value: float) -> None:
+        if g == len(self.groups):
+            if value > self.best_value:
+                self.best_value, self.best = value, list(self.chosen)
+            return
+
+        _, count, candidates = self.groups[g]
+        if k == count:
+            self._fill(g + 1, 0, 0, value)
+            return
+
+        rest = self._rest_bound(g + 1) + self._budget_slack()
+        for pos in range(start, len(candidates)):
+            # Lagrangian bound: value + lam * budget left + best reduced values of the open spots
+            bound = value + self._group_top(g, count - k, pos) + rest
+            if bound <= self.best_value + 1e-9:
+                return  # candidates are sorted: later positions can't do better
+            if self._expired():
+                self.open_bound = max(self.open_bound, bound)
+                return
+            i = candidates[pos]
+            if i in self.used or not self._pickable(i):
+                continue
+            self._take(i)
+            self._fill(g, k + 1, pos + 1, value + self.values[i])
+            self._drop(i)
+
+    def run(self) -> Dict:
+        self.started = time.perf_counter()
+        self.nodes, self.timed_out = 0, False
+        self.best: Optional[List[int]] = None
+        self.best_value = -np.inf
+        self.open_bound = -np.inf
+        self.used, self.used_names, self.chosen = set(), set(), []
+        self.club_counts: Counter = Counter()
+        self.budget_left = self.constraints.budget if self.constraints.budget is not None else np.inf
+
+        # Unconstrained optimum: the root bound, and the answer when it already fits
+        root_bound, relaxed = self._assignment(self.values)
+        if relaxed is not None and self._satisfies(relaxed):
+            self.best, self.best_value = relaxed, root_bound
+        elif np.isfinite(root_bound):
+            if self.lam:
+                # Budget-aware assignment as a starting incumbent
+                _, seed = self._assignment(self.reduced)
+                if seed is not None and self._satisfies(seed):
+                    self.best, self.best_value = seed, float(sum(self.values[i] for i in seed))
+            self._fill(0, 0, 0, 0.0)
+
+        if self.best is None:
+            status = "time_limit" if self.timed_out else "infeasible"
+            upper = root_bound if np.isfinite(root_bound) else None
+            return self._result(status, [], None, upper, None)
+
+        upper = self.best_value
+        if self.timed_out:
+            upper = min(root_bound, max(self.best_value, self.open_bound))
+        gap = (upper - self.best_value) / max(abs(upper), 1e-9)
+        return self._result("time_limit" if self.timed_out else "optimal", self.best, self.best_value, upper, gap)
+
+    def _result(self, status: str, xi: List[int], score, upper, gap) -> Dict:
+        return {
+            "formation": self.formation_name,
+            "key_type": self.key_type,
+            "status": status,
+            "score": score,
+            "upper_bound": upper,
+            "gap": gap,
+            "nodes": self.nodes,
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "best_eleven": [self.builder._minimal_player(self.players[i]) for i in self._ordered(xi)],
+        }
+
+    def _ordered(self, xi: List[int]) -> List[int]:
+        """Starting XI in formation line order, best first within a line."""
+        line_of = {}
+        for g, (slot_type, count, candidates) in enumerate(self.groups):
+            for i in candidates:
+                line_of.setdefault(i, slot_type[0])
+        lines = list(FORMATIONS[self.formation_name])
+        return sorted(xi, key=lambda i: (lines.index(line_of[i]), -self.values[i]))
+
+
+def constrained_best_xi(
+    players: List[Dict],
+    formation_name: str = "433",
+    key_type: str = "mental",
+    constraints: Optional[XIConstraints] = None,
+    time_budget_ms: float = 500,
+) -> Dict:
+    return ConstrainedXISearch(BestXIBuilder(players), formation_name, key_type, constraints, time_budget_ms).run()
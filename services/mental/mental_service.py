@@ -1,11 +1,17 @@
 from __future__ import annotations
 from collections import defaultdict
-from typing import List
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 import numpy as np
 import pandas as pd
+from sortedcontainers import SortedList
 
 from models.mental.mental import ROLE_AWARE_MENTAL_TRAIT_MAPPING
 from models.ranking.ranking import LOWER_IS_BETTER
+from services.fbref.manifest import payload_hash
+
+MENTAL_DIR = Path("data/mental")
+MIN_MINUTES = 300
 
 # Mapping FBRef/Transfermarkt-style positions to mental roles
 ROLE_MAPPING = {
@@ -41,86 +47,68 @@ class MentalRankingService:
 
     def score_team_players(self) -> List[dict]:
         """Compute mental score for all players with full breakdown (avg + stat contributions)."""
+        IncrementalMentalScorer().replace_teams({None: self.players})
+        return self.players
 
-        flat_rows = []
-        for player in self.players:
-            raw_role = player.get("role", "OTHER")
-            mental_role = ROLE_MAPPING.get(raw_role, "OTHER")
-            row = {"name": player.get("name"), "role": mental_role, "__player__": player}
-            for group, stats in (player.get("stats") or {}).items():
-                for k, v in (stats or {}).items():
-                    row[f"{group}:{k}"] = v
-            flat_rows.append(row)
-
-        df = pd.DataFrame(flat_rows)
-        df["standard:Playing Time - Min"] = df.get("standard:Playing Time - Min", 0).fillna(0)
-        df = df[df["standard:Playing Time - Min"] >= 300]
-        if df.empty:
-            return self.players
-
-        breakdowns = {}
-        m_raw_list = []
-
-        for idx, row in df.iterrows():
-            role = row.get("role", "OTHER")
-            trait_map = self.merged_trait_map(role)
-
-            trait_scores = []
-            trait_breakdown = {}
-
-            for trait, keys in trait_map.items():
-                vals = []
-                stat_contrib = {}
-                for key in keys:
-                    val = row.get(key)
-                    if val is None or not np.isfinite(val):
-                        stat_contrib[key] = None  # keep key visible, mark as missing
-                        continue
-                    z = float(val)
-                    if key.split(":")[-1] in LOWER_IS_BETTER:
-                        z *= -1
-                    vals.append(z)
-                    stat_contrib[key] = z
-
-                if vals:
-                    avg_trait = np.mean(vals)
-                    trait_scores.append(avg_trait)
-                    trait_breakdown[trait] = {
-                        "avg": avg_trait,
-                        "stats": stat_contrib,
-                    }
-                else:
-                    # still include the trait, but mark avg as None
-                    trait_breakdown[trait] = {
-                        "avg": None,
-                        "stats": stat_contrib,
-                    }
-
-            if trait_scores:
-                m_raw = np.mean(trait_scores)
-            else:
-                m_raw = 50.0 + min(0.5, row.get("standard:Playing Time - Min", 0) / 3000)
-
-            breakdowns[idx] = trait_breakdown
-            m_raw_list.append(m_raw)
+    @staticmethod
+    def mental_role(player: dict) -> str:
+        return ROLE_MAPPING.get(player.get("role", "OTHER"), "OTHER")
 
-        df["m_raw"] = m_raw_list
+    @classmethod
+    def score_player(cls, player: dict) -> Optional[Tuple[str, float, dict]]:
+        """
+        Raw (role-independent) part of the score for one player: (mental role, m_raw, breakdown),
+        or None below MIN_MINUTES. Only the percentile 'm' depends on other players.
+        """
+        stats = player.get("stats") or {}
+        minutes = (stats.get("standard") or {}).get("Playing Time - Min")
+        if minutes is None or pd.isna(minutes):
+            minutes = 0
+        if minutes < MIN_MINUTES:
+            return None
+
+        role = cls.mental_role(player)
+        trait_map = cls.merged_trait_map(role)
+
+        trait_scores = []
+        trait_breakdown = {}
+
+        for trait, keys in trait_map.items():
+            vals = []
+            stat_contrib = {}
+            for key in keys:
+                group, _, stat = key.partition(":")
+                val = (stats.get(group) or {}).get(stat)
+                if val is None or not np.isfinite(val):
+                    stat_contrib[key] = None  # keep key visible, mark as missing
+                    continue
+                z = float(val)
+                if key.split(":")[-1] in LOWER_IS_BETTER:
+                    z *= -1
+                vals.append(z)
+                stat_contrib[key] = z
+
+            if vals:
+                avg_trait = np.mean(vals)
+                trait_scores.append(avg_trait)
+                trait_breakdown[trait] = {
+                    "avg": avg_trait,
+                    "stats": stat_contrib,
+                }
+            else:
+                # still include the trait, but mark avg as None
+                trait_breakdown[trait] = {
+                    "avg": None,
+                    "stats": stat_contrib,
+                }
 
-        # --- Role-aware normalization: percentile rank ---
-        df["m"] = np.nan
-        for role, group in df.groupby("role"):
-            df.loc[group.index, "m"] = group["m_raw"].rank(pct=True) * 100
+        if trait_scores:
+            m_raw = np.mean(trait_scores)
+        else:
+            m_raw = 50.0 + min(0.5, minutes / 3000)
 
-        # --- Write back to player dict ---
-        for idx, row in df.iterrows():
-            player_obj = row["__player__"]
-            player_obj["mental"] = {
-                "m_raw": float(np.round(row["m_raw"], 5)),
-                "m": float(np.round(row["m"], 1)),
-                "breakdown": breakdowns.get(idx, {}),
-            }
+        return role, m_raw, trait_breakdown
 
-        return self.players
 
     @staticmethod
     def merged_trait_map(role: str) -> dict[str, list[str]]:
@@ -143,3 +131,119 @@ class MentalRankingService:
             combined[trait].extend(keys)
 
         return combined
+
+
+class IncrementalMentalScorer:
+    """
+    Keeps raw mental scores per team and one SortedList of m_raw per mental role.
+    replace_teams() rescores only players whose role/stats digest changed, and then
+    refreshes the percentile 'm' of the role groups whose values moved with binary
+    searches, instead of rescoring and re-ranking the whole input set.
+    Percentiles match pandas rank(pct=True) (average rank for ties).
+    """
+
+    def __init__(self):
+        self.players: Dict[Any, List[dict]] = {}
+        self.entries: Dict[Any, List[Tuple[dict, str, float, dict]]] = {}
+        self.by_role: Dict[str, SortedList] = defaultdict(SortedList)
+        self.digests: Dict[Any, Dict[int, str]] = {}  # team -> {id(player dict in entries): role/stats digest}
+        self.rescored = 0  # players whose raw score was computed by the last update
+
+    @staticmethod
+    def _digest(player: dict) -> str:
+        # content hash rather than ==: NaN stats never compare equal to themselves
+        return payload_hash({"role": player.get("role"), "stats": player.get("stats")})
+
+    def replace_teams(self, teams: Dict[Any, Iterable[dict]]) -> Set[str]:
+        """
+        Swap in new player lists for the given teams (an empty list removes a team).
+        Returns the roles whose set of raw scores changed.
+        """
+        affected: Set[str] = set()
+        self.rescored = 0
+
+        for team, players in teams.items():
+            players = list(players)
+            old_entries = self.entries.pop(team, [])
+            old_digests = self.digests.pop(team, {})
+            previous: Dict[Any, List[Tuple[dict, str, float, dict]]] = defaultdict(list)
+            for entry in old_entries:
+                previous[entry[0].get("name")].append(entry)
+
+            entries, digests = [], {}
+            for player in players:
+                digest = self._digest(player)
+                candidates = previous.get(player.get("name"))
+                old = candidates[0] if candidates else None
+                # seeded teams have no stored digests yet: hash the old player once here
+                if old is not None and (old_digests.get(id(old[0])) or self._digest(old[0])) == digest:
+                    candidates.pop(0)
+                    _, role, m_raw, breakdown = old
+                    if "mental" in old[0]:
+                        player["mental"] = old[0]["mental"]
+                else:
+                    scored = MentalRankingService.score_player(player)
+                    self.rescored += 1
+                    if scored is None:
+                        continue
+                    role, m_raw, breakdown = scored
+                    self.by_role[role].add(m_raw)
+                    affected.add(role)
+                entries.append((player, role, m_raw, breakdown))
+                digests[id(player)] = digest
+
+            # old entries nobody reused leave their role groups
+            for leftover in previous.values():
+                for _, role, m_raw, _ in leftover:
+                    self.by_role[role].remove(m_raw)
+                    affected.add(role)
+
+            if players:
+                self.players[team] = players
+                self.entries[team] = entries
+                self.digests[team] = digests
+            else:
+                self.players.pop(team, None)
+
+        self._apply(affected)
+        return affected
+
+    def seed_team(self, team: Any, players: List[dict], entries: List[Tuple[dict, str, float, dict]]) -> None:
+        """Load already-scored entries (e.g. from a materialized file) without rescoring."""
+        self.players[team] = players
+        self.entries[team] = entries
+        for _, role, m_raw, _ in entries:
+            self.by_role[role].add(m_raw)
+        # digests are computed on the first replace_teams that touches the team
+
+    def percentile(self, role: str, m_raw: float) -> float:
+        """Average-rank percentile (0-100] of m_raw within a role group."""
+        values = self.by_role[role]
+        lo, hi = values.bisect_left(m_raw), values.bisect_right(m_raw)
+        return (lo + 1 + hi) / 2 / len(values) * 100
+
+    def all_players(self) -> List[dict]:
+        return [p for players in self.players.values() for p in players]
+
+    def _apply(self, roles: Set[str]) -> None:
+        """Recompute 'm' in the given roles, replacing "mental" only where a value actually moved."""
+        if not roles:
+            return
+        for entries in self.entries.values():
+            for player, role, m_raw, breakdown in entries:
+                if role not in roles:
+                    continue
+                mental = {
+                    "m_raw": float(np.round(m_raw, 5)),
+                    "m": float(np.round(self.percentile(role, m_raw), 1)),
+                    "breakdown": breakdown,
+                }
+                if player.get("mental") != mental:
+                    player["mental"] = mental
+
+
+def materialize_league_mental(league: str, season) -> Dict[str, Any]:
+    """Score a whole league once and write data/mental/<league>-<season>.json."""
+    from services.mental.mental_store import get_mental_store
+
+    return get_mental_store().materialize(league, season)
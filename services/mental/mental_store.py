@@ -0,0 +1,184 @@
+from __future__ import annotations
+import json
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import events
+from services.fbref.league.fbref_utils import _atomic_write_json, _safe_name, _sanitize
+from services.fbref.loader import FBRefLoaderService
+from services.mental.mental_service import MENTAL_DIR, IncrementalMentalScorer, MentalRankingService
+
+log = logging.getLogger(__name__)
+
+PLAYERS_DIR = Path("data/players")
+
+
+class MentalScoreStore:
+    """
+    Mental scores (m_raw, role-percentile m, breakdown) materialized per league and
+    data version. The table lives in memory and in data/mental/<league>-<season>.json.
+    When player files change only the changed teams are rescored (IncrementalMentalScorer);
+    the percentiles of their role groups are refreshed in place.
+    Callers get per-player copies, so mutating "mental" never touches the table.
+    """
+
+    def __init__(self, mental_dir: Path = MENTAL_DIR):
+        self.mental_dir = mental_dir
+        self._tables: Dict[Tuple[str, str], Tuple[str, List[dict]]] = {}
+        self._scorers: Dict[Tuple[str, str], IncrementalMentalScorer] = {}
+        self._signatures: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        events.subscribe(events.TEAM_DATA_CHANGED, self._on_team_data_changed)
+
+    def _path(self, league: str, season: str) -> Path:
+        return self.mental_dir / f"{_safe_name(league)}-{season}.json"
+
+    # ---- public ----
+    def version(self, league: str, season) -> Optional[str]:
+        """Data version the in-memory table was built from, if loaded."""
+        entry = self._tables.get((league, str(season)))
+        return entry[0] if entry else None
+
+    def get_players(self, league: str, season, scored_only: bool = True) -> List[dict]:
+        """All league players with "mental" attached, as copies safe to mutate."""
+        return [self.copy_player(p) for p in self.table(league, season, scored_only)]
+
+    def table(self, league: str, season, scored_only: bool = True) -> List[dict]:
+        """The cached players themselves, not copies: read-only; copy_player() one before mutating it."""
+        _, players = self._table(league, str(season))
+        return [p for p in players if not scored_only or p.get("mental", {}).get("m_raw") is not None]
+
+    def get_team_players(self, league: str, season, team: str) -> List[dict]:
+        team_norm = team.lower()
+        return [p for p in self.get_players(league, season) if (p["__meta__"].get("team") or "").lower() == team_norm]
+
+    def materialize(self, league: str, season) -> Dict[str, Any]:
+        """Force a full rescore and rewrite of the league table."""
+        key = (league, str(season))
+        with self._lock:
+            self._scorers.pop(key, None)
+            self._signatures.pop(key, None)
+            self._tables.pop(key, None)
+            version, players = self._refresh(*key)
+        return {"players": sum(1 for p in players if "mental" in p), "version": version, "file": str(self._path(*key))}
+
+    def invalidate(self, league: str, season: Optional[str] = None) -> None:
+        """Drop the cached table; the next read re-checks the files and rescores changed teams only."""
+        for key in [k for k in self._tables if k[0] == league and (season is None or k[1] == str(season))]:
+            self._tables.pop(key, None)
+
+    # ---- internals ----
+    def _table(self, league: str, season: str) -> Tuple[str, List[dict]]:
+        key = (league, season)
+        version = FBRefLoaderService.league_data_version(league)
+        entry = self._tables.get(key)
+        if entry and entry[0] == version:
+            return entry
+
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry and entry[0] == version:
+                return entry
+            return self._refresh(league, season)
+
+    def _refresh(self, league: str, season: str) -> Tuple[str, List[dict]]:
+        key = (league, season)
+        signatures = FBRefLoaderService.league_file_signatures(league)
+        version = FBRefLoaderService.league_data_version(league, signatures)
+        if not signatures and key not in self._scorers:
+            # no player files (unknown or misspelled league): nothing to score, cache or write
+            return version, []
+
+        scorer = self._scorers.get(key)
+        if scorer is None:
+            scorer = self._load_materialized(league, season, version, signatures)
+            if scorer is not None:
+                self._scorers[key] = scorer
+                self._signatures[key] = signatures
+                self._tables[key] = (version, scorer.all_players())
+                return self._tables[key]
+            scorer = self._scorers[key] = IncrementalMentalScorer()
+
+        previous = self._signatures.get(key, {})
+        changed = [name for name, sig in signatures.items() if previous.get(name) != sig]
+        removed = [name for name in previous if name not in signatures]
+        teams = {name: self._load_team(league, name) for name in changed}
+        teams.update({name: [] for name in removed})
+        affected = scorer.replace_teams(teams)
+
+        self._signatures[key] = signatures
+        self._tables[key] = (version, scorer.all_players())
+        if affected:
+            # persist only when scores moved; re-touched but identical files just refresh signatures
+            self._write(league, season, version, scorer)
+            log.info(
+                "mental scores for %s %s: %d teams updated, %d players rescored (version %s)",
+                league, season, len(teams), scorer.rescored, version,
+            )
+        return self._tables[key]
+
+    @staticmethod
+    def _load_team(league: str, file_name: str) -> List[dict]:
+        players = FBRefLoaderService.load_team_file_players(PLAYERS_DIR / league / file_name)
+        for p in players:
+            p.pop("mental", None)
+        return players
+
+    def _write(self, league: str, season: str, version: str, scorer: IncrementalMentalScorer) -> None:
+        rows = [
+            {"file": team, "name": player.get("name"), "raw": float(m_raw), "mental": _sanitize(player["mental"])}
+            for team, entries in scorer.entries.items()
+            for player, _, m_raw, _ in entries
+        ]
+        _atomic_write_json(
+            self._path(league, season),
+            {"league": league, "season": season, "version": version, "players": rows},
+            indent=None,
+        )
+
+    def _load_materialized(
+        self, league: str, season: str, version: str, signatures: Dict[str, str]
+    ) -> Optional[IncrementalMentalScorer]:
+        """Seed a scorer from data/mental rows when the file matches the current data version."""
+        path = self._path(league, season)
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return None
+        if data.get("version") != version:
+            return None
+
+        rows = {(r["file"], r["name"]): r for r in data.get("players", [])}
+        scorer = IncrementalMentalScorer()
+        for file_name in signatures:
+            players = self._load_team(league, file_name)
+            entries = []
+            for p in players:
+                row = rows.get((file_name, p.get("name")))
+                if row is None:
+                    continue
+                p["mental"] = row["mental"]
+                entries.append((p, MentalRankingService.mental_role(p), row["raw"], row["mental"]["breakdown"]))
+            scorer.seed_team(file_name, players, entries)
+        return scorer
+
+    def _on_team_data_changed(self, payload: Dict[str, Any]) -> None:
+        if payload.get("teams"):
+            self.invalidate(payload["league"], payload.get("season"))
+
+    @staticmethod
+    def copy_player(player: dict) -> dict:
+        p = dict(player)
+        if "mental" in p:
+            p["mental"] = dict(p["mental"])
+        return p
+
+
+@lru_cache(maxsize=1)
+def get_mental_store() -> MentalScoreStore:
+    return MentalScoreStore()
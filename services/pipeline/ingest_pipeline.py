@@ -0,0 +1,254 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from services.fbref.build_runner import DEFAULT_LEAGUES, DEFAULT_SEASONS
+from services.fbref.league.fbref_utils import _atomic_write_json, _safe_name
+from services.fbref.manifest import TeamManifest
+
+log = logging.getLogger(__name__)
+
+PIPELINE_DIR = Path("data/pipeline")
+PLAYERS_DIR = Path("data/players")
+
+# Stage order. League stages run once per league; team stages run per team in parallel.
+STAGES: List[str] = ["build", "enrich", "rank", "mental", "render"]
+LEAGUE_STAGES = {"build", "rank", "mental"}
+TEAM_STAGES = {"enrich", "render"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class PipelineCheckpoint:
+    """
+    Persisted progress for one league/season under data/pipeline/<league>-<season>.json:
+    {"teams": {team: {"hash": <player manifest hash>, "done": [stage, ...]}}, "runs": [...]}
+    A team whose built payload hash changes starts again after "build".
+    """
+
+    def __init__(self, league: str, season: str):
+        self.path = PIPELINE_DIR / f"{_safe_name(league)}-{season}.json"
+        self.data: Dict[str, Any] = {"teams": {}, "runs": []}
+        if self.path.exists():
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def team(self, team: str) -> Dict[str, Any]:
+        return self.data["teams"].setdefault(team, {"hash": None, "done": []})
+
+    def is_done(self, team: str, stage: str) -> bool:
+        return stage in self.team(team)["done"]
+
+    def mark_done(self, team: str, stage: str) -> None:
+        done = self.team(team)["done"]
+        if stage not in done:
+            done.append(stage)
+
+    def sync_hash(self, team: str, digest: Optional[str]) -> None:
+        """Reset a team's progress when its built data no longer matches the checkpoint."""
+        entry = self.team(team)
+        if entry["hash"] != digest:
+            entry["hash"] = digest
+            entry["done"] = ["build"] if digest else []
+
+    def save(self) -> None:
+        _atomic_write_json(self.path, self.data)
+
+
+# ------------------ Stage workers ------------------
+def _build_league(league: str, season: str) -> Dict[str, Any]:
+    from services.fbref.build_runner import build_league, publish_changes, raise_for_failed_stages
+
+    # players, teams and league_init, exactly as the standalone build
+    result = build_league(league, season)
+    publish_changes(result)
+    raise_for_failed_stages(result)
+    stages = result["stages"]
+    return {
+        "changed": stages["players"]["result"]["changed"],
+        "league_init": len(stages["league_init"]["result"]["stat_types"]),
+        "stage_seconds": {name: s["seconds"] for name, s in stages.items()},
+    }
+
+
+def _enrich_team(league: str, season: str, team: str) -> Dict[str, Any]:
+    from services.transfermarket.player_info_service import fix_incomplete_players
+
+    fix_incomplete_players(PLAYERS_DIR / league / f"{team}.json", interactive=False)
+    return {}
+
+
+def _rank_league(league: str, season: str) -> Dict[str, Any]:
+    from services.ranking.player_ranking_service import FBRefPlayerRankingService
+
+    FBRefPlayerRankingService(league).rank_players()
+    return {}
+
+
+def _materialize_mental(league: str, season: str) -> Dict[str, Any]:
+    from services.mental.mental_service import materialize_league_mental
+
+    return materialize_league_mental(league, int(season))
+
+
+def _render_team(league: str, season: str, team: str) -> Dict[str, Any]:
+    from services.plotting.team.team_plotting_service import TeamPlottingService
+
+    path = asyncio.run(TeamPlottingService(league, int(season), team).prerender())
+    return {"file": str(path)}
+
+
+LEAGUE_STAGE_FNS: Dict[str, Callable[[str, str], Dict[str, Any]]] = {
+    "build": _build_league,
+    "rank": _rank_league,
+    "mental": _materialize_mental,
+}
+TEAM_STAGE_FNS: Dict[str, Callable[[str, str, str], Dict[str, Any]]] = {
+    "enrich": _enrich_team,
+    "render": _render_team,
+}
+
+
+# ------------------ Runner ------------------
+class IngestPipeline:
+    """
+    build → enrich → rank → mental → render for one league/season, resumable per team.
+    League stages run only if some team still needs them; team stages run only for
+    teams that have not completed them, across a process pool.
+    """
+
+    def __init__(self, league: str, season: str, max_workers: Optional[int] = None, skip: Sequence[str] = ()):
+        self.league = league
+        self.season = str(season)
+        self.max_workers = max_workers
+        self.skip = set(skip)
+        self.checkpoint = PipelineCheckpoint(league, self.season)
+
+    def _teams(self) -> List[str]:
+        league_dir = PLAYERS_DIR / self.league
+        return sorted(f.stem for f in league_dir.glob("*.json")) if league_dir.exists() else []
+
+    def _sync_hashes(self, teams: List[str]) -> None:
+        manifest = TeamManifest("players", self.league)
+        for team in teams:
+            self.checkpoint.sync_hash(team, manifest.get(team))
+
+    def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        summary: Dict[str, Any] = {"league": self.league, "season": self.season, "stages": {}}
+
+        for stage in STAGES:
+            if stage in self.skip:
+                summary["stages"][stage] = {"skipped": True}
+                continue
+
+            stage_start = time.perf_counter()
+            try:
+                if stage in LEAGUE_STAGES:
+                    result = self._run_league_stage(stage)
+                else:
+                    result = self._run_team_stage(stage)
+            except Exception as e:
+                log.exception("pipeline stage %s failed for %s", stage, self.league)
+                summary["stages"][stage] = {"ok": False, "error": str(e)}
+                break
+            finally:
+                self.checkpoint.save()
+
+            summary["stages"][stage] = {"ok": True, "seconds": round(time.perf_counter() - stage_start, 3), **result}
+
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        self.checkpoint.data["runs"] = (self.checkpoint.data.get("runs", []) + [{"at": _now(), "seconds": summary["seconds"]}])[-20:]
+        self.checkpoint.save()
+        return summary
+
+    def _run_league_stage(self, stage: str) -> Dict[str, Any]:
+        if stage == "build":
+            # the player manifest decides which teams changed; their progress restarts
+            result = _build_league(self.league, self.season)
+            teams = self._teams()
+            self._sync_hashes(teams)
+            for team in teams:
+                self.checkpoint.mark_done(team, "build")
+            return result
+
+        teams = self._teams()
+        self._sync_hashes(teams)
+        pending = [t for t in teams if not self.checkpoint.is_done(t, stage)]
+        if not pending:
+            return {"ran": False}
+
+        result = LEAGUE_STAGE_FNS[stage](self.league, self.season)
+        for team in teams:
+            self.checkpoint.mark_done(team, stage)
+        return {"ran": True, "teams": pending, **result}
+
+    def _run_team_stage(self, stage: str) -> Dict[str, Any]:
+        teams = self._teams()
+        self._sync_hashes(teams)
+        pending = [t for t in teams if not self.checkpoint.is_done(t, stage)]
+        if stage == "render":
+            # also redo renders whose stored inputs no longer match the team file (edited
+            # outside the pipeline, or written before renders carried an inputs digest)
+            pending += [t for t in teams if t not in pending and not self._render_is_fresh(t)]
+        if not pending:
+            return {"teams": []}
+
+        failed: Dict[str, str] = {}
+        fn = TEAM_STAGE_FNS[stage]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(fn, self.league, self.season, team): team for team in pending}
+            for fut in as_completed(futures):
+                team = futures[fut]
+                try:
+                    fut.result()
+                    self.checkpoint.mark_done(team, stage)
+                    self.checkpoint.save()
+                except Exception as e:
+                    log.exception("%s failed for %s", stage, team)
+                    failed[team] = str(e)
+
+        return {"teams": [t for t in pending if t not in failed], "failed": failed}
+
+
+    def _render_is_fresh(self, team: str) -> bool:
+        from services.plotting.team.team_plotting_service import TeamPlottingService
+
+        return TeamPlottingService.load_prerendered(self.league, int(self.season), team) is not None
+
+
+def run_pipeline(
+    leagues: Optional[Sequence[str]] = None,
+    seasons: Optional[Sequence[str]] = None,
+    max_workers: Optional[int] = None,
+    skip: Sequence[str] = (),
+) -> List[Dict[str, Any]]:
+    return [
+        IngestPipeline(league, season, max_workers=max_workers, skip=skip).run()
+        for season in (seasons or DEFAULT_SEASONS)
+        for league in (leagues or DEFAULT_LEAGUES)
+    ]
+
+
+# ------------------ Entry ------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable ingest: build → enrich → rank → mental → render.")
+    parser.add_argument("--leagues", nargs="+", default=DEFAULT_LEAGUES)
+    parser.add_argument("--seasons", nargs="+", default=DEFAULT_SEASONS)
+    parser.add_argument("--workers", type=int, default=None, help="processes for per-team stages")
+    parser.add_argument("--skip", nargs="*", default=[], choices=STAGES, help="stages to skip, e.g. build enrich")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for s in run_pipeline(args.leagues, args.seasons, max_workers=args.workers, skip=args.skip):
+        print(f"🏆 {s['league']} {s['season']}: {s['seconds']}s")
+        for stage, info in s["stages"].items():
+            print(f"   {stage}: {info}")
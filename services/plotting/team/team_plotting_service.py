@@ -9,8 +9,29 @@ import matplotlib.patheffects as path_effects
 from scipy.ndimage import gaussian_filter
 import numpy as np
 import io
+import json
 import base64
+from functools import lru_cache
+from pathlib import Path
 from typing import List, Dict, Optional, Union
+from services.fbref.league.fbref_utils import _atomic_write_json, _safe_name
+from services.fbref.manifest import payload_hash
+
+RENDER_DIR = Path("data/renders")
+PLAYERS_DIR = Path("data/players")
+
+
+def render_inputs_digest(players: List[dict]) -> str:
+    """Hash of what the prerendered charts read from a team file: player roles and stats."""
+    return payload_hash(
+        [{"name": p.get("name"), "role": p.get("role"), "stats": p.get("stats")} for p in players if isinstance(p, dict)]
+    )
+
+
+@lru_cache(maxsize=256)
+def _team_file_digest(path: str, signature: str) -> str:
+    # keyed on size:mtime_ns, so each rewrite of the file is parsed and hashed once
+    return render_inputs_digest(FBRefLoaderService.load_team_file_players(Path(path)))
 
 # ----------------------
 # Zone mapping by role (simplified)
@@ -295,4 +316,49 @@ class TeamPlottingService:
         return {
             "attacking": attack_heatmap,
             "defending": defense_heatmap
-        }
\ No newline at end of file
+        }
+
+    # ----------------------
+    # Pre-rendered charts
+    # ----------------------
+    @staticmethod
+    def _render_path(league: str, season: int, team: str) -> Path:
+        return RENDER_DIR / f"{_safe_name(league)}-{season}" / f"{_safe_name(team)}.json"
+
+    async def prerender(self) -> Path:
+        """Render default chart + heatmaps once and store them for the team route."""
+        heatmaps = await self.get_team_heatmaps()
+        payload = {
+            "inputs": render_inputs_digest(self.all_players),
+            "default": await self.get_team_default_chart(),
+            "heatmap": {"attacking": heatmaps["attacking"], "defending": heatmaps["defending"]},
+        }
+        path = self._render_path(self.league, self.season, self.team)
+        _atomic_write_json(path, payload, indent=None)
+        return path
+
+    @staticmethod
+    def current_inputs_digest(league: str, team: str) -> Optional[str]:
+        """Render-inputs digest of the team's player file as it is now, or None if there is no file."""
+        team_file = PLAYERS_DIR / league / f"{team}.json"
+        try:
+            st = team_file.stat()
+        except FileNotFoundError:
+            return None
+        return _team_file_digest(str(team_file), f"{st.st_size}:{st.st_mtime_ns}")
+
+    @staticmethod
+    def load_prerendered(league: str, season: int, team: str) -> Optional[dict]:
+        """
+        Stored render for a team, or None if missing or rendered from other player data.
+        Freshness is judged on the roles/stats the charts use, not on mtimes: the rank
+        stage rewrites every team file with new rankings without changing those.
+        """
+        path = TeamPlottingService._render_path(league, season, team)
+        if not path.exists():
+            return None
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        digest = TeamPlottingService.current_inputs_digest(league, team)
+        if digest is not None and payload.get("inputs") != digest:
+            return None
+        return payload
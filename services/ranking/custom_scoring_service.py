@@ -0,0 +1,348 @@
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from models.ranking.ranking import LOWER_IS_BETTER
+from services.fbref.loader import FBRefLoaderService
+from services.mental.mental_service import MIN_MINUTES, MentalRankingService
+from services.ranking.role_stats_index import ranking_base_role
+
+RANK, MENTAL = "rank", "mental"
+MAX_CACHED_RESULTS = 64
+
+WeightMapping = Mapping[str, Mapping[str, float]]  # role -> {"group:metric": weight}
+TraitMapping = Mapping[str, Mapping[str, Union[str, Sequence[str]]]]  # role -> {trait: ["group:metric", ...]}
+
+
+def plan_hash(kind: str, mapping: Mapping[str, Any]) -> str:
+    """Stable hash of a scoring mapping; equal mappings share plans and cached results."""
+    payload = json.dumps({"kind": kind, "mapping": mapping}, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ------------------ League matrix ------------------
+class LeagueMatrix:
+    """
+    One league as arrays: X (players × metrics, NaN for missing), Z (X z-scored within
+    each ranking base role, ddof=0, same as rank_players) plus per-player role/minutes/meta.
+    Built once per data version and shared by every custom plan.
+    """
+
+    def __init__(self, players: List[dict], version: str = ""):
+        self.version = version
+        rows = []
+        for player in players:
+            row = {}
+            for group, stats in (player.get("stats") or {}).items():
+                for k, v in (stats or {}).items():
+                    row[f"{group}:{k}"] = v
+            rows.append(row)
+
+        frame = pd.DataFrame(rows).apply(pd.to_numeric, errors="coerce").astype(float) if rows else pd.DataFrame()
+        self.metrics: List[str] = list(frame.columns)
+        self.metric_index: Dict[str, int] = {m: i for i, m in enumerate(self.metrics)}
+        self.X = frame.to_numpy(dtype=float) if rows else np.zeros((0, 0))
+
+        self.names = [p.get("name") for p in players]
+        self.teams = [(p.get("__meta__") or {}).get("team") for p in players]
+        self.player_roles = [p.get("role") for p in players]
+        self.base_roles = np.array([ranking_base_role(p) for p in players], dtype=object)
+        self.mental_roles = np.array([MentalRankingService.mental_role(p) for p in players], dtype=object)
+        minutes_col = self.metric_index.get("standard:Playing Time - Min")
+        self.minutes = np.nan_to_num(self.X[:, minutes_col]) if minutes_col is not None else np.zeros(len(players))
+
+        z = frame.copy()
+        for _, idx in frame.groupby(self.base_roles).groups.items():
+            block = frame.loc[idx]
+            std = block.std(ddof=0)
+            std = std.where(std.notna() & np.isfinite(std) & (std != 0), 1.0)
+            z.loc[idx] = (block - block.mean()) / std
+        self.Z = z.to_numpy(dtype=float) if rows else np.zeros((0, 0))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+_matrices: Dict[Tuple[str, str], LeagueMatrix] = {}
+_matrix_lock = threading.Lock()
+
+
+def get_league_matrix(league: str, season) -> LeagueMatrix:
+    key = (league, str(season))
+    version = FBRefLoaderService.league_data_version(league)
+    matrix = _matrices.get(key)
+    if matrix is not None and matrix.version == version:
+        return matrix
+
+    with _matrix_lock:
+        matrix = _matrices.get(key)
+        if matrix is None or matrix.version != version:
+            matrix = _matrices[key] = LeagueMatrix(FBRefLoaderService.load_all_players(league, season), version)
+        return matrix
+
+
+# ------------------ Plans ------------------
+def _is_lower_better(metric: str) -> bool:
+    # same test rank_players / score_player apply
+    tail = metric.split(":", 1)[1] if ":" in metric else metric
+    return tail in LOWER_IS_BETTER
+
+
+@dataclass
+class RankPlan:
+    """Role weights as one (metrics × roles) matrix: scores = Z @ W, read at each player's role column."""
+    roles: List[str]
+    W: np.ndarray
+    unknown: List[str]
+
+    @classmethod
+    def compile(cls, mapping: WeightMapping, matrix: LeagueMatrix) -> "RankPlan":
+        roles = list(mapping)
+        W = np.zeros((len(matrix.metrics), len(roles)))
+        unknown: List[str] = []
+        for j, role in enumerate(roles):
+            for metric, weight in mapping[role].items():
+                i = matrix.metric_index.get(metric)
+                if i is None:
+                    unknown.append(metric)
+                    continue
+                W[i, j] += -float(weight) if _is_lower_better(metric) else float(weight)
+        return cls(roles, W, sorted(set(unknown)))
+
+    @classmethod
+    def compile_batch(cls, mappings: Sequence[WeightMapping], matrix: LeagueMatrix) -> "RankPlan":
+        """N variants as one (metrics × roles·N) matrix; column role_idx·N + j holds variant j."""
+        roles = sorted({role for mapping in mappings for role in mapping})
+        n = len(mappings)
+        W = np.zeros((len(matrix.metrics), len(roles) * n))
+        unknown: List[str] = []
+        for j, mapping in enumerate(mappings):
+            plan = cls.compile({role: mapping.get(role, {}) for role in roles}, matrix)
+            W[:, j::n] = plan.W
+            unknown.extend(plan.unknown)
+        return cls(roles, W, sorted(set(unknown)))
+
+    def score_batch(self, matrix: LeagueMatrix, n: int) -> np.ndarray:
+        """(players × N) scores from a single Z @ W product; NaN for players outside the plan's roles."""
+        S = (np.nan_to_num(matrix.Z) @ self.W).reshape(len(matrix), len(self.roles), n)
+        role_idx = {role: i for i, role in enumerate(self.roles)}
+        idx = np.array([role_idx.get(r, -1) for r in matrix.base_roles])
+        scores = np.full((len(matrix), n), np.nan)
+        rows = idx >= 0
+        scores[rows] = S[np.flatnonzero(rows), idx[rows]]
+        return scores
+
+    def score(self, matrix: LeagueMatrix) -> Dict[str, np.ndarray]:
+        S = np.nan_to_num(matrix.Z) @ self.W
+        scores = np.full(len(matrix), np.nan)
+        for j, role in enumerate(self.roles):
+            rows = matrix.base_roles == role
+            scores[rows] = S[rows, j]
+        return {"score": scores}
+
+
+@dataclass
+class MentalPlan:
+    """
+    Trait lists as per-role (metrics × traits) count matrices A. With X0 = X (NaN→0) and
+    F = finite mask: trait avg = (X0 @ A) / (F @ A); m_raw = mean of traits with data.
+    """
+    roles: Dict[str, Tuple[List[str], np.ndarray]]
+    sign: np.ndarray
+    unknown: List[str]
+
+    @classmethod
+    def compile(cls, mapping: TraitMapping, matrix: LeagueMatrix) -> "MentalPlan":
+        base = mapping.get("ALL", {})
+        roles: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        unknown: List[str] = []
+        for role in set(matrix.mental_roles.tolist()):
+            traits: Dict[str, List[str]] = {}
+            for source in (base, mapping.get(role, {})):
+                for trait, keys in source.items():
+                    traits.setdefault(trait, []).extend([keys] if isinstance(keys, str) else list(keys))
+            A = np.zeros((len(matrix.metrics), len(traits)))
+            for j, keys in enumerate(traits.values()):
+                for key in keys:
+                    i = matrix.metric_index.get(key)
+                    if i is None:
+                        unknown.append(key)
+                    else:
+                        A[i, j] += 1
+            roles[role] = (list(traits), A)
+
+        sign = np.array([-1.0 if _is_lower_better(m) else 1.0 for m in matrix.metrics])
+        return cls(roles, sign, sorted(set(unknown)))
+
+    def score(self, matrix: LeagueMatrix) -> Dict[str, np.ndarray]:
+        finite = np.isfinite(matrix.X)
+        X0 = np.where(finite, matrix.X, 0.0) * self.sign
+        F = finite.astype(float)
+
+        m_raw = np.full(len(matrix), np.nan)
+        for role, (_, A) in self.roles.items():
+            rows = matrix.mental_roles == role
+            if not rows.any():
+                continue
+            sums, counts = X0[rows] @ A, F[rows] @ A
+            present = counts > 0
+            trait_avg = np.divide(sums, counts, out=np.zeros_like(sums), where=present)
+            n_traits = present.sum(axis=1)
+            fallback = 50.0 + np.minimum(0.5, matrix.minutes[rows] / 3000)
+            m_raw[rows] = np.where(n_traits > 0, trait_avg.sum(axis=1) / np.maximum(n_traits, 1), fallback)
+
+        m_raw[matrix.minutes < MIN_MINUTES] = np.nan
+        m = pd.Series(m_raw).groupby(matrix.mental_roles).rank(pct=True).to_numpy() * 100
+        return {"score": m, "m_raw": m_raw}
+
+
+# ------------------ Service ------------------
+class CustomScoringService:
+    """Compiles weight/trait mappings into plans and caches results by (mapping hash, league, data version)."""
+
+    def __init__(self, max_results: int = MAX_CACHED_RESULTS):
+        self.max_results = max_results
+        self._results: "OrderedDict[Tuple[str, str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def score(self, league: str, season, kind: str, mapping: Mapping[str, Any]) -> Tuple[str, Dict[str, Any], bool]:
+        """Returns (plan hash, {"score": array, ..., "unknown": [...]}, served_from_cache)."""
+        if kind not in (RANK, MENTAL):
+            raise ValueError(f"Unknown scoring kind '{kind}'. Expected '{RANK}' or '{MENTAL}'")
+        if not mapping:
+            raise ValueError("Empty mapping")
+
+        digest = plan_hash(kind, mapping)
+        matrix = get_league_matrix(league, season)
+        key = (digest, league, str(season), matrix.version)
+
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return digest, self._results[key], True
+
+        plan = (RankPlan if kind == RANK else MentalPlan).compile(mapping, matrix)
+        result = {**plan.score(matrix), "unknown": plan.unknown}
+
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return digest, result, False
+
+    def rankings(
+        self,
+        league: str,
+        season,
+        kind: str,
+        mapping: Mapping[str, Any],
+        role: Optional[str] = None,
+        top: int = 50,
+    ) -> Dict[str, Any]:
+        digest, result, cached = self.score(league, season, kind, mapping)
+        matrix = get_league_matrix(league, season)
+        scores = result["score"]
+
+        valid = np.isfinite(scores)
+        if role:
+            roles = matrix.base_roles if kind == RANK else matrix.mental_roles
+            valid &= roles == role.upper()
+        order = np.flatnonzero(valid)
+        order = order[np.argsort(-scores[order], kind="stable")][:top]
+
+        players = []
+        for i in order:
+            row = {
+                "name": matrix.names[i],
+                "team": matrix.teams[i],
+                "role": matrix.player_roles[i],
+                "score": round(float(scores[i]), 3),
+            }
+            if "m_raw" in result:
+                row["m_raw"] = round(float(result["m_raw"][i]), 5)
+            players.append(row)
+
+        return {
+            "plan": digest,
+            "cached": cached,
+            "kind": kind,
+            "league": league,
+            "season": season,
+            "version": matrix.version,
+            "unknown_metrics": result["unknown"],
+            "count": int(valid.sum()),
+            "players": players,
+        }
+
+
+    def sweep(
+        self,
+        league: str,
+        season,
+        variants: Sequence[WeightMapping],
+        top_k: int = 20,
+        role: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Score N weight variants at once and compare them: Spearman rank correlation and
+        top-k overlap for every pair. Nothing is written to disk.
+        """
+        if not variants:
+            raise ValueError("No variants to score")
+
+        matrix = get_league_matrix(league, season)
+        n = len(variants)
+        plan = RankPlan.compile_batch(variants, matrix)
+        scores = plan.score_batch(matrix, n)
+
+        rows = np.isfinite(scores).all(axis=1)
+        if role:
+            rows &= matrix.base_roles == role.upper()
+        scores = scores[rows]
+        ids = np.flatnonzero(rows)
+        if not len(scores):
+            raise ValueError("No players scored by these variants")
+
+        # Spearman = Pearson on (average) ranks
+        ranks = pd.DataFrame(scores).rank(method="average").to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            spearman = np.corrcoef(ranks, rowvar=False) if n > 1 else np.ones((1, 1))
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k] if k < len(scores) else np.tile(np.arange(len(scores))[:, None], (1, n))
+        top_sets = [set(top[:, j].tolist()) for j in range(n)]
+        overlap = np.array([[len(a & b) / k for b in top_sets] for a in top_sets])
+
+        leaders = []
+        for j in range(n):
+            order = top[:, j][np.argsort(-scores[top[:, j], j], kind="stable")]
+            leaders.append([
+                {"name": matrix.names[ids[i]], "team": matrix.teams[ids[i]], "role": matrix.player_roles[ids[i]], "score": round(float(scores[i, j]), 3)}
+                for i in order
+            ])
+
+        return {
+            "league": league,
+            "season": season,
+            "version": matrix.version,
+            "variants": n,
+            "players": int(len(scores)),
+            "top_k": k,
+            "unknown_metrics": plan.unknown,
+            "spearman": np.round(np.atleast_2d(spearman), 4).tolist(),
+            "top_k_overlap": np.round(overlap, 4).tolist(),
+            "top": leaders,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_custom_scoring_service() -> CustomScoringService:
+    return CustomScoringService()
@@ -1,8 +1,13 @@
+from dataclasses import dataclass
 from pathlib import Path
 import json
+import threading
+from typing import Dict, List
 import numpy as np
 import pandas as pd
 from models.ranking.ranking import LOWER_IS_BETTER, ROLE_BASE_MAP, ROLE_RANK_MAPPING
+from services.fbref.loader import FBRefLoaderService
+from utils.ranking_utils import normalized_scores, player_id, score_array
 
 class FBRefPlayerRankingService:
     def __init__(self, league_slug: str):
@@ -125,3 +130,39 @@ class FBRefPlayerRankingService:
             Path(file_path).write_text(
                 json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8"
             )
+
+
+@dataclass
+class RankedTable:
+    """A league's ranked players with their performance scores as arrays, per data version."""
+    version: str
+    players: List[dict]
+    scores: np.ndarray
+    normalized: np.ndarray
+    ids: List[str]
+
+
+_ranked_tables: Dict[str, RankedTable] = {}
+_ranked_lock = threading.Lock()
+
+
+def get_ranked_table(league_slug: str) -> RankedTable:
+    """Loaded once per data version; rank_players rewrites the files, which bumps the version."""
+    version = FBRefLoaderService.league_data_version(league_slug)
+    table = _ranked_tables.get(league_slug)
+    if table is not None and table.version == version:
+        return table
+
+    with _ranked_lock:
+        table = _ranked_tables.get(league_slug)
+        if table is None or table.version != version:
+            players = FBRefPlayerRankingService(league_slug).load_players()
+            scores = score_array(players, ("ranking", "performance"))
+            table = _ranked_tables[league_slug] = RankedTable(
+                version=version,
+                players=players,
+                scores=scores,
+                normalized=normalized_scores(scores),
+                ids=[player_id(p) for p in players],
+            )
+        return table
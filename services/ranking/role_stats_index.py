@@ -0,0 +1,151 @@
+from __future__ import annotations
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.ranking.ranking import ROLE_BASE_MAP
+from services.fbref.loader import FBRefLoaderService
+
+
+def ranking_base_role(player: dict) -> str:
+    role = player.get("role") or player.get("position", "NA")
+    return ROLE_BASE_MAP.get(role, role)
+
+
+@dataclass(frozen=True)
+class MetricStats:
+    mean: float
+    std: float  # population std (ddof=0), as in rank_players
+    values: np.ndarray  # sorted, NaN dropped
+
+    @property
+    def n(self) -> int:
+        return len(self.values)
+
+
+class RoleStatsIndex:
+    """
+    Per-league statistics for every (role, "group:metric"): mean, std and a sorted value array.
+    Built once per data version; zscore() is O(1) and percentile() a binary search.
+    """
+
+    def __init__(self, stats: Dict[Tuple[str, str], MetricStats], players: Optional[Dict[str, dict]] = None, version: str = ""):
+        self.stats = stats
+        self.players = players or {}  # lowercased name -> {"name", "team", "role", "values"}
+        self.version = version
+
+    @classmethod
+    def from_players(cls, players: Iterable[dict], role_of: Callable[[dict], str] = ranking_base_role, version: str = "") -> "RoleStatsIndex":
+        rows = []
+        lookup: Dict[str, dict] = {}
+        for player in players:
+            row = {"__role__": role_of(player)}
+            for group, stats in (player.get("stats") or {}).items():
+                for k, v in (stats or {}).items():
+                    row[f"{group}:{k}"] = v
+            rows.append(row)
+            if player.get("name"):
+                lookup[player["name"].lower()] = {
+                    "name": player["name"],
+                    "team": (player.get("__meta__") or {}).get("team"),
+                    "role": row["__role__"],
+                    "values": row,
+                }
+        if not rows:
+            return cls({}, lookup, version)
+
+        df = pd.DataFrame(rows)
+        values = df.drop(columns="__role__").apply(pd.to_numeric, errors="coerce")
+        values = values.loc[:, values.notna().any()]
+
+        stats: Dict[Tuple[str, str], MetricStats] = {}
+        for role, idx in df.groupby("__role__").groups.items():
+            block = values.loc[idx].to_numpy(dtype=float)
+            for j, metric in enumerate(values.columns):
+                col = block[:, j]
+                col = np.sort(col[~np.isnan(col)])
+                if not len(col):
+                    continue
+                stats[(role, metric)] = MetricStats(float(col.mean()), float(col.std()), col)
+        return cls(stats, lookup, version)
+
+    # ---- queries ----
+    def get(self, role: str, metric: str) -> Optional[MetricStats]:
+        return self.stats.get((role, metric))
+
+    def player(self, name: str) -> Optional[dict]:
+        return self.players.get(name.lower().strip())
+
+    @staticmethod
+    def player_value(player: dict, metric: str) -> Optional[float]:
+        try:
+            value = float(player["values"].get(metric))
+        except (TypeError, ValueError):
+            return None
+        return value if np.isfinite(value) else None
+
+    def roles(self) -> List[str]:
+        return sorted({r for r, _ in self.stats})
+
+    def metrics(self, role: str) -> List[str]:
+        return sorted(m for r, m in self.stats if r == role)
+
+    def zscore(self, role: str, metric: str, value: float) -> Optional[float]:
+        s = self.get(role, metric)
+        if s is None or value is None or not np.isfinite(value):
+            return None
+        return (value - s.mean) / (s.std if s.std and np.isfinite(s.std) else 1.0)
+
+    def percentile(self, role: str, metric: str, value: float) -> Optional[float]:
+        """Share of the role group below value, ties counted half (0-100)."""
+        s = self.get(role, metric)
+        if s is None or value is None or not np.isfinite(value):
+            return None
+        lo = np.searchsorted(s.values, value, side="left")
+        hi = np.searchsorted(s.values, value, side="right")
+        return float((lo + hi) / 2 / s.n * 100)
+
+    def describe(self, role: str, metric: str, value: Optional[float] = None) -> Optional[dict]:
+        s = self.get(role, metric)
+        if s is None:
+            return None
+        out = {
+            "role": role,
+            "metric": metric,
+            "n": s.n,
+            "mean": s.mean,
+            "std": s.std,
+            "min": float(s.values[0]),
+            "median": float(np.median(s.values)),
+            "max": float(s.values[-1]),
+        }
+        if value is not None:
+            out.update({
+                "value": value,
+                "zscore": self.zscore(role, metric, value),
+                "percentile": self.percentile(role, metric, value),
+            })
+        return out
+
+
+_indexes: Dict[Tuple[str, str], RoleStatsIndex] = {}
+_lock = threading.Lock()
+
+
+def get_role_stats_index(league: str, season) -> RoleStatsIndex:
+    """League index for the current data version; rebuilt only when the player files change."""
+    key = (league, str(season))
+    version = FBRefLoaderService.league_data_version(league)
+    index = _indexes.get(key)
+    if index is not None and index.version == version:
+        return index
+
+    with _lock:
+        index = _indexes.get(key)
+        if index is None or index.version != version:
+            players = FBRefLoaderService.load_all_players(league, season)
+            index = _indexes[key] = RoleStatsIndex.from_players(players, version=version)
+        return index
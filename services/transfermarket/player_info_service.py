@@ -9,6 +9,8 @@ from typing import Literal, Optional, Dict
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 
+from services.transfermarket.role_inference_service import _infer_role, get_role_inference_service
+
 # ------------------ Constants ------------------
 RoleType = Literal["GK", "CB", "FB", "DM", "CM", "AM", "W", "CF", "OTHER"]
 BASE = "https://fbref.com"
@@ -16,60 +18,6 @@ INDEX = f"{BASE}/en/players"
 SEARCH = f"{BASE}/search/search.fcgi?search="
 CACHE_DIR = Path("data/fbref/cache")
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
-COMPOUND_ROLES_FILE = Path("data/fbref/compound_roles.json")
-
-# ------------------ Constants ------------------
-DEFAULT_COMPOUND_MAP = {
-    "CB-FB,RIGHT": "RB",
-    "CB-FB,LEFT": "LB",
-    "AM": "AM",
-    "CM-DM-WM": "CM",
-    "CB": "CB",
-    "CB,LEFT": "LCB",
-    "CB,RIGHT": "LCB",
-    "DM,RIGHT" :"RWB",
-    "DM,LEFT" :"LWB",
-    "CM-DM": "DM",
-    "AM-CM-WM": "AM",
-    "FB": "FB",
-    "AM-CM-DM-WM": "CM",
-    "AM-WM": "W",
-    "CB-CM-DM": "CB",
-    "WM": "W",
-    "AM-CM": "AM",
-    "AM-CM-DM": "CM",
-    "AM,RIGHT": "RW",
-    "AM,LEFT": "LW",
-    "AM-WM,RIGHT": "RW",
-    "AM-WM,LEFT": "LW",
-    "WM-AM,RIGHT": "LW",
-    "WM-AM,LEFT": "RW",
-    "GK": "GK",
-    "FW-MF": "W",
-    "DF-MF": "DM",
-    "DM-FB-WM,RIGHT" : "RWB",
-    "DM-FB-WM,LEFT" : "LWB"
-}
-
-SIMPLE_ROLE_MAP = {
-    "GK": "GK",
-    "CB": "CB",
-    "FB": "FB",
-    "DM": "DM",
-    "CM": "CM",
-    "AM": "AM",
-    "W": "W",
-    "CF": "CF"
-}
-
-FALLBACK_MAP = {
-    "GK": "GK",
-    "DF": "CB",
-    "MF": "CM",
-    "FW,MF": "AM",
-    "MF,FW": "AM",
-    "FW": "CF"
-}
 
 # ------------------ Logging ------------------
 def log(msg: str):
@@ -100,16 +48,6 @@ def _cache_read(path: Path) -> Optional[str]:
 def _cache_write(path: Path, content: str):
     path.write_text(content, encoding="utf-8")
 
-def clean_text(s: str) -> str:
-    """Uppercase, remove unicode/zero-width spaces, normalize commas, strip."""
-    if not s:
-        return ""
-    s = s.replace("▪", "")
-    s = re.sub(r"[\u200b\u00A0]", "", s)  # zero-width & non-breaking spaces
-    s = re.sub(r"\s*,\s*", ",", s)        # normalize commas
-    s = re.sub(r"\s+", "-", s)            # normalize internal spaces as dash
-    return s.upper().strip()
-
 def _fetch_html(url: str) -> str:
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
@@ -122,85 +60,17 @@ def _fetch_html(url: str) -> str:
 
 # ------------------ Compound Role Handling ------------------
 def load_compound_map() -> Dict[str, str]:
-    if COMPOUND_ROLES_FILE.exists():
-        return json.loads(COMPOUND_ROLES_FILE.read_text("utf-8"))
-    else:
-        COMPOUND_ROLES_FILE.write_text(json.dumps(DEFAULT_COMPOUND_MAP, indent=2, ensure_ascii=False))
-        return DEFAULT_COMPOUND_MAP.copy()
+    return get_role_inference_service().compound_map.copy()
 
 def save_new_compound_candidate(key: str):
-    key = key.strip().upper()
-    compound_map = load_compound_map()
-    if key not in compound_map:
-        compound_map[key] = None
-        COMPOUND_ROLES_FILE.write_text(json.dumps(compound_map, indent=2, ensure_ascii=False))
-        print(f"🆕 Added new compound role candidate: {key}")
+    """Queue a compound key; written to compound_roles.json on flush_candidates()."""
+    get_role_inference_service().add_candidate(key)
 
 # ------------------ Infer Role ------------------
 def infer_role(position_text: str, position: str = None, compound_map: Optional[Dict[str, str]] = None) -> str:
-    position_text_raw = position_text or ""
-    position_raw = position or ""
-    compound_map = compound_map or DEFAULT_COMPOUND_MAP
-
-    print(f"[ROLE INFER] Starting role inference. position_text='{position_text_raw}', position='{position_raw}'")
-
-    text = clean_text(position_text_raw)
-    position_clean = clean_text(position_raw)
-
-    # 1️⃣ Check parentheses first
-    paren_match = re.search(r"\((.*?)\)", text)
-    if paren_match:
-        inner_text = paren_match.group(1)
-        print(f"[ROLE INFER] Found parentheses content: '{inner_text}'")
-
-        # Lookup full inner text first
-        mapped_role = compound_map.get(inner_text)
-        print(f"[ROLE INFER] Trying full compound map: '{inner_text}' → {mapped_role}")
-
-        if not mapped_role:
-            # Try just role part before any comma
-            role_part = inner_text.split(",")[0]
-            mapped_role = compound_map.get(role_part)
-            print(f"[ROLE INFER] Trying role part only: '{role_part}' → {mapped_role}")
-
-        if mapped_role:
-            # Handle side info if role is FB/W/AM
-            side_part = None
-            if "," in inner_text:
-                side_part = inner_text.split(",")[1]
-            if mapped_role in ("FB", "W", "AM") and side_part:
-                side_letter = side_part[0]
-                if mapped_role == "FB":
-                    mapped_role = "RB" if side_letter == "R" else "LB"
-                if mapped_role == "W":
-                    mapped_role = "RW" if side_letter == "R" else "LW"
-                if mapped_role == "AM":
-                    mapped_role = "RW" if side_letter == "R" else "LW"
-            print(f"[ROLE INFER] Role determined from parentheses: {mapped_role}")
-            return mapped_role
-
-        # Fallback dash split in parentheses
-        for part in role_part.split("-"):
-            if part in SIMPLE_ROLE_MAP:
-                print(f"[ROLE INFER] Fallback dash split: '{part}' → {SIMPLE_ROLE_MAP[part]}")
-                return SIMPLE_ROLE_MAP[part]
-
-    # 2️⃣ Try main text outside parentheses
-    main_roles = text.split("(")[0].split("-")
-    for r in main_roles:
-        if r in SIMPLE_ROLE_MAP:
-            print(f"[ROLE INFER] Main text match: '{r}' → {SIMPLE_ROLE_MAP[r]}")
-            return SIMPLE_ROLE_MAP[r]
-
-    # 3️⃣ Fallback using original position field
-    if position_clean in FALLBACK_MAP:
-        fallback_role = FALLBACK_MAP[position_clean]
-        print(f"[ROLE INFER] Using FALLBACK_MAP: '{position_clean}' → {fallback_role}")
-        return fallback_role
-
-    # 4️⃣ Nothing found
-    print("[ROLE INFER] No mapping found → returning 'NA'")
-    return "NA"
+    if compound_map is not None:
+        return _infer_role(position_text, position, compound_map)[0]
+    return get_role_inference_service().infer(position_text, position)
 
 # ------------------ Player Resolver ------------------
 def resolve_player(full_name: str, team_hint: Optional[str] = None, reuse_cache: bool = True) -> Optional[Dict]:
@@ -357,6 +227,7 @@ def enrich_team(team_file: Path):
 
         print(f"✅ {player['name']} → {player['role']} | {player['foot']} | 365 stats: {len(player['player_365_stats']['per90'])} entries")
 
+    get_role_inference_service().flush_candidates()
     print(f"💾 Final save done → {team_file}")
 
 def enrich_league(league_dir: Path):
@@ -399,6 +270,7 @@ def enrich_player_by_url(root_dir: Path, player_name: str, fbref_url: str, team_
 
     # Save after enrichment
     team_file.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    get_role_inference_service().flush_candidates()
     print(f"✅ {player_name} enriched → {player['role']} | {player['foot']} | 365 stats: {len(player['player_365_stats']['per90'])} entries")
 
 # ------------------ Diagnostic & Interactive Fix ------------------
@@ -433,10 +305,11 @@ def log_incomplete_players(team_file: Path):
     return missing_players
 
 
-def fix_incomplete_players(team_file: Path):
+def fix_incomplete_players(team_file: Path, interactive: bool = True):
     """
     Auto-enrich all players in a team JSON missing critical FBref data.
-    If a player cannot be resolved automatically, prompts user to input a manual FBref URL.
+    If a player cannot be resolved automatically, prompts user to input a manual FBref URL
+    (or skips them when interactive=False, e.g. from the ingest pipeline).
     """
     data = json.loads(team_file.read_text("utf-8"))
     players = data.get("players", [])
@@ -472,6 +345,9 @@ def fix_incomplete_players(team_file: Path):
             continue
 
         # 3️⃣ Manual URL fallback
+        if not interactive:
+            print(f"⚠️ Skipped {player_name}, could not resolve automatically.")
+            continue
         manual_url = input(f"❌ Could not automatically resolve {player_name}. Enter FBref URL (or leave blank to skip): ").strip()
         if manual_url:
             enrich_player_by_url(team_file.parent, player_name, manual_url, team_name=team_file.stem)
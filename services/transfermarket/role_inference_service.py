@@ -0,0 +1,239 @@
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+# ------------------ Constants ------------------
+COMPOUND_ROLES_FILE = Path("data/fbref/compound_roles.json")
+ROOT_DIR = Path("data/players")
+
+DEFAULT_COMPOUND_MAP = {
+    "CB-FB,RIGHT": "RB",
+    "CB-FB,LEFT": "LB",
+    "AM": "AM",
+    "CM-DM-WM": "CM",
+    "CB": "CB",
+    "CB,LEFT": "LCB",
+    "CB,RIGHT": "LCB",
+    "DM,RIGHT" :"RWB",
+    "DM,LEFT" :"LWB",
+    "CM-DM": "DM",
+    "AM-CM-WM": "AM",
+    "FB": "FB",
+    "AM-CM-DM-WM": "CM",
+    "AM-WM": "W",
+    "CB-CM-DM": "CB",
+    "WM": "W",
+    "AM-CM": "AM",
+    "AM-CM-DM": "CM",
+    "AM,RIGHT": "RW",
+    "AM,LEFT": "LW",
+    "AM-WM,RIGHT": "RW",
+    "AM-WM,LEFT": "LW",
+    "WM-AM,RIGHT": "LW",
+    "WM-AM,LEFT": "RW",
+    "GK": "GK",
+    "FW-MF": "W",
+    "DF-MF": "DM",
+    "DM-FB-WM,RIGHT" : "RWB",
+    "DM-FB-WM,LEFT" : "LWB"
+}
+
+SIMPLE_ROLE_MAP = {
+    "GK": "GK",
+    "CB": "CB",
+    "FB": "FB",
+    "DM": "DM",
+    "CM": "CM",
+    "AM": "AM",
+    "W": "W",
+    "CF": "CF"
+}
+
+FALLBACK_MAP = {
+    "GK": "GK",
+    "DF": "CB",
+    "MF": "CM",
+    "FW,MF": "AM",
+    "MF,FW": "AM",
+    "FW": "CF"
+}
+
+_PAREN_RX = re.compile(r"\((.*?)\)")
+_ZERO_WIDTH_RX = re.compile(r"[\u200b\u00A0]")
+_COMMA_RX = re.compile(r"\s*,\s*")
+_SPACE_RX = re.compile(r"\s+")
+
+
+def clean_text(s: str) -> str:
+    """Uppercase, remove unicode/zero-width spaces, normalize commas, strip."""
+    if not s:
+        return ""
+    s = s.replace("▪", "")
+    s = _ZERO_WIDTH_RX.sub("", s)  # zero-width & non-breaking spaces
+    s = _COMMA_RX.sub(",", s)      # normalize commas
+    s = _SPACE_RX.sub("-", s)      # normalize internal spaces as dash
+    return s.upper().strip()
+
+
+def _infer_role(position_text: Optional[str], position: Optional[str], compound_map: Dict[str, str]) -> Tuple[str, Optional[str]]:
+    """
+    Pure role inference. Returns (role, candidate) where candidate is the
+    parentheses content that had no compound mapping, if any.
+    """
+    text = clean_text(position_text or "")
+    position_clean = clean_text(position or "")
+    candidate = None
+
+    # 1️⃣ Check parentheses first
+    paren_match = _PAREN_RX.search(text)
+    if paren_match:
+        inner_text = paren_match.group(1)
+
+        # Lookup full inner text first, then just the role part before any comma
+        role_part = inner_text.split(",")[0]
+        mapped_role = compound_map.get(inner_text) or compound_map.get(role_part)
+
+        if mapped_role:
+            # Handle side info if role is FB/W/AM
+            side_part = inner_text.split(",")[1] if "," in inner_text else None
+            if mapped_role in ("FB", "W", "AM") and side_part:
+                side_letter = side_part[0]
+                if mapped_role == "FB":
+                    mapped_role = "RB" if side_letter == "R" else "LB"
+                else:
+                    mapped_role = "RW" if side_letter == "R" else "LW"
+            return mapped_role, None
+
+        candidate = inner_text
+
+        # Fallback dash split in parentheses
+        for part in role_part.split("-"):
+            if part in SIMPLE_ROLE_MAP:
+                return SIMPLE_ROLE_MAP[part], candidate
+
+    # 2️⃣ Try main text outside parentheses
+    for r in text.split("(")[0].split("-"):
+        if r in SIMPLE_ROLE_MAP:
+            return SIMPLE_ROLE_MAP[r], candidate
+
+    # 3️⃣ Fallback using original position field
+    if position_clean in FALLBACK_MAP:
+        return FALLBACK_MAP[position_clean], candidate
+
+    # 4️⃣ Nothing found
+    return "NA", candidate
+
+
+class RoleInferenceService:
+    """
+    Loads compound_roles.json once, memoizes inference per (position_text, position)
+    and collects unmapped compound keys in memory until flush_candidates().
+    """
+
+    def __init__(self, compound_file: Path = COMPOUND_ROLES_FILE):
+        self.compound_file = compound_file
+        self._file_keys: Set[str] = set()
+        self.compound_map = self._load_compound_map()
+        self.candidates: Set[str] = set()
+        self._cache: Dict[Tuple[str, str], str] = {}
+
+    def _load_compound_map(self) -> Dict[str, str]:
+        compound_map = {clean_text(k): v for k, v in DEFAULT_COMPOUND_MAP.items()}
+        if not self.compound_file.exists():
+            self.compound_file.parent.mkdir(parents=True, exist_ok=True)
+            self.compound_file.write_text(json.dumps(DEFAULT_COMPOUND_MAP, indent=2, ensure_ascii=False))
+            self._file_keys = set(compound_map)
+            return compound_map
+
+        file_map = json.loads(self.compound_file.read_text("utf-8"))
+        for key, role in file_map.items():
+            key = clean_text(key)
+            self._file_keys.add(key)
+            # null entries are unreviewed candidates, not mappings
+            if role:
+                compound_map[key] = role
+        return compound_map
+
+    def infer(self, position_text: Optional[str], position: Optional[str] = None) -> str:
+        key = (position_text or "", position or "")
+        role = self._cache.get(key)
+        if role is None:
+            role, candidate = _infer_role(position_text, position, self.compound_map)
+            if candidate:
+                self.add_candidate(candidate)
+            self._cache[key] = role
+        return role
+
+    def add_candidate(self, key: str) -> None:
+        key = clean_text(key.strip())
+        if key and key not in self._file_keys:
+            self.candidates.add(key)
+
+    def infer_players(self, players: Iterable[dict]) -> int:
+        """Re-infer 'role' in place for enriched players. Returns how many changed."""
+        changed = 0
+        for player in players:
+            if not isinstance(player, dict) or "position_text" not in player:
+                continue
+            role = self.infer(player.get("position_text"), player.get("position"))
+            if player.get("role") != role:
+                player["role"] = role
+                changed += 1
+        return changed
+
+    def infer_league(self, league_dir: Path) -> Dict:
+        """Re-infer roles for every team file in a league, rewriting only files that changed."""
+        summary = {"league": league_dir.name, "players": 0, "changed": 0, "files_written": 0}
+        for team_file in sorted(league_dir.glob("*.json")):
+            data = json.loads(team_file.read_text("utf-8"))
+            players = data.get("players", [])
+            summary["players"] += len(players)
+
+            changed = self.infer_players(players)
+            if changed:
+                team_file.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+                summary["changed"] += changed
+                summary["files_written"] += 1
+        return summary
+
+    def infer_all(self, root: Path = ROOT_DIR) -> List[Dict]:
+        summaries = [self.infer_league(d) for d in sorted(root.iterdir()) if d.is_dir()]
+        self.flush_candidates()
+        return summaries
+
+    def flush_candidates(self) -> int:
+        """Append all collected candidates to compound_roles.json in a single write."""
+        if not self.candidates:
+            return 0
+
+        file_map = json.loads(self.compound_file.read_text("utf-8")) if self.compound_file.exists() else {}
+        added = sorted(self.candidates - {clean_text(k) for k in file_map})
+        for key in added:
+            file_map[key] = None
+        if added:
+            self.compound_file.write_text(json.dumps(file_map, indent=2, ensure_ascii=False))
+            log.info("Added %d compound role candidates: %s", len(added), added)
+
+        self._file_keys.update(self.candidates)
+        self.candidates.clear()
+        return len(added)
+
+
+@lru_cache(maxsize=1)
+def get_role_inference_service() -> RoleInferenceService:
+    return RoleInferenceService()
+
+
+# ------------------ Entry ------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    for s in get_role_inference_service().infer_all(ROOT_DIR):
+        print(f"🏆 {s['league']}: {s['players']} players, {s['changed']} roles changed, {s['files_written']} files written")
+    print(f"⏱️ Re-inferred all leagues in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# core.config requires these; the tests never talk to Mongo/OpenAI or start the scheduler
+for key in ("MONGODB_URI", "DB_NAME", "ADMIN_KEY", "OPENAI_KEY"):
+    os.environ.setdefault(key, "test")
+os.environ.setdefault("REFRESH_CRON", "")
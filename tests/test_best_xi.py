@@ -0,0 +1,143 @@
+import math
+import random
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from services.mental.best_11_service import BestXIBuilder, formation_slots, player_value, slot_roles
+from services.mental.constrained_xi_service import ConstrainedXISearch, XIConstraints, foot_fits
+
+ROLE_COUNTS = {"GK": 2, "CB": 4, "FB": 3, "DM": 2, "CM": 3, "AM": 2, "LW": 2, "RW": 1, "CF": 3}
+CLUBS = ["Alpha", "Beta", "Gamma"]
+FORMATIONS = ["433", "4231", "532"]
+
+
+def make_pool(seed: int):
+    rng = random.Random(seed)
+    pool = []
+    for role, count in ROLE_COUNTS.items():
+        for n in range(count):
+            pool.append({
+                "name": f"{role}-{n}",
+                "role": role,
+                "age": rng.randint(18, 34),
+                "foot": rng.choice(["Left", "Right", "Right", "Both"]),
+                "market_value": rng.randint(5, 60),
+                "__meta__": {"team": rng.choice(CLUBS)},
+                "mental": {"m_raw": round(rng.gauss(0, 1), 3)},
+                "ranking": {"performance": round(rng.uniform(-1, 1), 3)},
+            })
+    # the same player listed for a second club (mid-season transfer) and a player without a usable role
+    star = max((p for p in pool if p["role"] == "CF"), key=lambda p: p["mental"]["m_raw"])
+    pool.append({**star, "__meta__": {"team": "Delta"}, "mental": {"m_raw": star["mental"]["m_raw"] - 0.01}})
+    pool.append({"name": "Nobody", "role": "NA", "mental": {"m_raw": 99.0}, "ranking": {"performance": 9.0}})
+    return pool
+
+
+def brute_force(pool, formation, key_type="mental", constraints=None):
+    """Best summed value over every valid XI, trying each combination per slot type."""
+    constraints = constraints or XIConstraints()
+    slots = [(line, sub, None) for line, sub in formation_slots(formation)]
+    for key, feet in constraints.feet.items():
+        spots = [n for n, (line, sub, _) in enumerate(slots) if sub == key or (sub is None and line == key)]
+        for n, foot in zip(spots, feet):
+            slots[n] = (slots[n][0], slots[n][1], foot)
+    groups = list(Counter(slots).items())
+    best = -math.inf
+
+    def eligible(slot_type):
+        line, sub, foot = slot_type
+        return [
+            i for i, p in enumerate(pool)
+            if p["role"] in slot_roles(line, sub) and constraints.allows(p) and foot_fits(p, foot)
+        ]
+
+    def rec(g, chosen):
+        nonlocal best
+        if g == len(groups):
+            names = [pool[i]["name"] for i in chosen]
+            clubs = Counter(pool[i]["__meta__"]["team"] for i in chosen)
+            if len(set(names)) < len(names):
+                return
+            if constraints.max_per_club is not None and max(clubs.values()) > constraints.max_per_club:
+                return
+            if constraints.budget is not None and sum(pool[i][constraints.cost_field] for i in chosen) > constraints.budget:
+                return
+            best = max(best, sum(player_value(pool[i], key_type) for i in chosen))
+            return
+        slot_type, count = groups[g]
+        for combo in combinations([i for i in eligible(slot_type) if i not in chosen], count):
+            rec(g + 1, chosen + list(combo))
+
+    rec(0, [])
+    return best
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("formation", FORMATIONS)
+@pytest.mark.parametrize("key_type", ["mental", "performance"])
+def test_solve_matches_brute_force(seed, formation, key_type):
+    pool = make_pool(seed)
+    builder = BestXIBuilder(pool)
+    xi = builder.solve_indexes(formation, key_type)
+
+    assert len(xi) == 11
+    assert len({builder.index.players[i]["name"] for i in xi}) == 11
+    assert all(builder.index.players[i]["role"] != "NA" for i in xi)
+    value = sum(player_value(builder.index.players[i], key_type) for i in xi)
+    assert value == pytest.approx(brute_force(pool, formation, key_type))
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize(
+    "constraints",
+    [
+        XIConstraints(max_per_club=5),
+        XIConstraints(min_age=20, max_age=33),
+        XIConstraints(feet={"FB": ["left"], "CF": ["right"]}),
+        XIConstraints(budget=300),
+        XIConstraints(max_per_club=5, max_age=32, budget=330),
+    ],
+    ids=["club", "age", "feet", "budget", "mixed"],
+)
+def test_constrained_search_matches_brute_force(seed, constraints):
+    pool = make_pool(seed)
+    expected = brute_force(pool, "433", "mental", constraints)
+    result = ConstrainedXISearch(BestXIBuilder(pool), "433", "mental", constraints, time_budget_ms=5000).run()
+
+    if expected == -math.inf:
+        assert result["status"] == "infeasible"
+        return
+    assert result["status"] == "optimal"
+    assert result["score"] == pytest.approx(expected)
+    assert len(result["best_eleven"]) == 11
+
+
+def test_substitutes_rank_unscored_players_last():
+    pool = make_pool(0)
+    for p in pool[:5]:
+        p.pop("ranking")
+
+    builder = BestXIBuilder(pool)
+    xi = builder.solve_indexes("433", "performance")
+    subs = builder.substitutes(xi, "performance", limit=len(pool), any_role=True)
+    values = [player_value(p, "performance") for p in subs]
+    unscored = sum(1 for i, p in enumerate(builder.index.players) if "ranking" not in p and i not in xi)
+
+    assert unscored > 0
+    assert values == sorted(values, reverse=True)
+    assert values[len(values) - unscored:] == [-math.inf] * unscored
+    assert -math.inf not in values[: len(values) - unscored]
+    assert not {p["name"] for p in subs} & {builder.index.players[i]["name"] for i in xi}
+
+
+def test_missing_value_still_fills_a_slot():
+    pool = make_pool(1)
+    keepers = [p for p in pool if p["role"] == "GK"]
+    for p in keepers:
+        p.pop("ranking")
+
+    xi = BestXIBuilder(pool).solve_formation("433", "performance")
+    assert len(xi) == 11
+    assert sum(p["role"] == "GK" for p in xi) == 1
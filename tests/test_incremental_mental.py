@@ -0,0 +1,124 @@
+import copy
+import json
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from services.mental.mental_service import IncrementalMentalScorer, MentalRankingService
+
+ROLES = ["GK", "CB", "CM", "CF"]
+
+
+def make_player(rng: random.Random, name: str, role: str, minutes: int = 900) -> dict:
+    stats = {"standard": {"Playing Time - Min": minutes}}
+    for keys in MentalRankingService.merged_trait_map(role).values():
+        for key in keys:
+            group, _, stat = key.partition(":")
+            # a few holes: missing stats arrive as NaN from the team files
+            value = math.nan if rng.random() < 0.15 else round(rng.gauss(0, 1), 2)
+            stats.setdefault(group, {})[stat] = value
+    return {"name": name, "role": role, "stats": stats}
+
+
+def make_teams(seed: int = 0, teams: int = 4, size: int = 12) -> dict:
+    rng = random.Random(seed)
+    out = {}
+    for t in range(teams):
+        players = [make_player(rng, f"T{t}-P{n}", ROLES[n % len(ROLES)]) for n in range(size)]
+        players.append(make_player(rng, f"T{t}-bench", "CM", minutes=120))  # below MIN_MINUTES: never scored
+        out[f"team-{t}.json"] = players
+    return out
+
+
+def reloaded(players: list) -> list:
+    """Same content as re-reading the team file: fresh dicts and fresh NaN objects (nan != nan)."""
+    return json.loads(json.dumps(players))
+
+
+def mental_by_player(scorer: IncrementalMentalScorer) -> dict:
+    return {p["name"]: p.get("mental") for p in scorer.all_players()}
+
+
+def full_rescore(teams: dict) -> IncrementalMentalScorer:
+    scorer = IncrementalMentalScorer()
+    scorer.replace_teams(copy.deepcopy(teams))
+    return scorer
+
+
+def test_percentiles_match_pandas_rank():
+    scorer = full_rescore(make_teams())
+    rows = [
+        {"name": p["name"], "role": role, "m_raw": m_raw, "m": p["mental"]["m"]}
+        for entries in scorer.entries.values()
+        for p, role, m_raw, _ in entries
+    ]
+    df = pd.DataFrame(rows)
+    expected = (df.groupby("role")["m_raw"].rank(pct=True) * 100).round(1)
+
+    assert list(df["m"]) == pytest.approx(list(expected))
+    assert all("mental" not in p for p in scorer.all_players() if p["name"].endswith("bench"))
+
+
+def test_identical_team_with_nan_stats_is_not_rescored():
+    teams = make_teams()
+    scorer = full_rescore(teams)
+    before = mental_by_player(scorer)
+    mental_objects = {p["name"]: p["mental"] for p in scorer.all_players() if "mental" in p}
+
+    affected = scorer.replace_teams({"team-1.json": reloaded(teams["team-1.json"])})
+
+    assert affected == set()
+    assert scorer.rescored == 1  # only the unscored bench player is looked at again
+    assert mental_by_player(scorer) == before
+    # untouched teams keep their very dicts: nothing downstream sees a change
+    assert all(p["mental"] is mental_objects[p["name"]] for p in scorer.all_players() if "mental" in p)
+
+
+def test_changed_player_matches_full_rescore():
+    teams = make_teams()
+    scorer = full_rescore(teams)
+
+    changed = copy.deepcopy(teams["team-2.json"])
+    target = changed[1]  # a CB
+    for group in target["stats"].values():
+        for stat in group:
+            if stat != "Playing Time - Min":
+                group[stat] = 3.0
+    teams["team-2.json"] = changed
+
+    affected = scorer.replace_teams({"team-2.json": copy.deepcopy(changed)})
+
+    assert affected == {MentalRankingService.mental_role(target)}
+    assert scorer.rescored == 2  # the edited player and the unscored bench player
+    assert mental_by_player(scorer) == mental_by_player(full_rescore(teams))
+
+
+def test_added_and_removed_teams_match_full_rescore():
+    teams = make_teams()
+    scorer = full_rescore(teams)
+
+    extra = make_teams(seed=7, teams=1)["team-0.json"]
+    for p in extra:
+        p["name"] = "new-" + p["name"]
+    scorer.replace_teams({"team-0.json": [], "team-9.json": copy.deepcopy(extra)})
+    del teams["team-0.json"]
+    teams["team-9.json"] = extra
+
+    assert set(scorer.players) == set(teams)
+    assert mental_by_player(scorer) == mental_by_player(full_rescore(teams))
+
+
+def test_seeded_team_reuses_stored_scores():
+    teams = make_teams()
+    source = full_rescore(teams)
+
+    seeded = IncrementalMentalScorer()
+    for team, entries in source.entries.items():
+        seeded.seed_team(team, source.players[team], entries)
+    affected = seeded.replace_teams({"team-3.json": reloaded(teams["team-3.json"])})
+
+    assert affected == set()
+    assert seeded.rescored == 1
+    assert mental_by_player(seeded) == mental_by_player(source)
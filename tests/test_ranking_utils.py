@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from utils.ranking_utils import format_cursor, normalized_scores, parse_cursor, score_array, top_k_indices
+
+
+def _reference_order(scores, ids):
+    """Brute force: score desc, id asc, NaN dropped."""
+    return sorted((i for i in range(len(scores)) if not np.isnan(scores[i])), key=lambda i: (-scores[i], ids[i]))
+
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(7)
+    scores = rng.integers(0, 20, size=200).astype(float)  # plenty of ties
+    scores[rng.choice(200, size=15, replace=False)] = np.nan
+    ids = [f"p{i:03d}" for i in rng.permutation(200)]
+    return scores, ids
+
+
+def test_parse_cursor():
+    assert parse_cursor(None) is None
+    assert parse_cursor("") is None
+    assert parse_cursor("12.5,abc") == (12.5, "abc")
+    assert parse_cursor("3,team:name, with comma") == (3.0, "team:name, with comma")
+    assert parse_cursor(format_cursor(0.1, "x")) == (0.1, "x")
+    for bad in ("12.5", "12.5,", "abc,x"):
+        with pytest.raises(ValueError):
+            parse_cursor(bad)
+
+
+def test_no_limit_returns_full_order(table):
+    scores, ids = table
+    order, cursor = top_k_indices(scores, ids, None)
+    assert order.tolist() == _reference_order(scores, ids)
+    assert cursor is None
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 185, 500])
+def test_paging_walks_the_full_order(table, limit):
+    scores, ids = table
+    seen, cursor = [], None
+    while True:
+        page, next_cursor = top_k_indices(scores, ids, limit, parse_cursor(cursor))
+        assert len(page) <= limit
+        seen.extend(page.tolist())
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert seen == _reference_order(scores, ids)
+
+
+def test_last_full_page_has_no_cursor():
+    order, cursor = top_k_indices(np.array([3.0, 2.0, 1.0]), ["a", "b", "c"], 3)
+    assert order.tolist() == [0, 1, 2]
+    assert cursor is None
+
+
+def test_score_array_and_normalization():
+    players = [{"mental": {"m": 10}}, {"mental": {}}, {"mental": {"m": 30}}, {"mental": {"m": True}}]
+    scores = score_array(players, ("mental", "m"))
+    assert scores[0] == 10 and scores[2] == 30
+    assert np.isnan(scores[1]) and np.isnan(scores[3])
+
+    norm = normalized_scores(scores)
+    assert norm[0] == 0 and norm[2] == 100 and np.isnan(norm[1])
+    assert normalized_scores(np.array([5.0, 5.0])).tolist() == [50.0, 50.0]
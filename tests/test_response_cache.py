@@ -0,0 +1,164 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from core import events
+from core.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    ResponseCacheMiddleware,
+    etag_matches,
+    negotiate_encoding,
+    normalized_query,
+)
+from utils.serialization_utils import NDJSONResponse
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache(max_bytes=1 << 20, version_ttl=60)
+    cache.data_version = lambda: cache.test_version
+    cache.test_version = "v1"
+    yield cache
+    events.unsubscribe(events.TEAM_DATA_CHANGED, cache._on_team_data_changed)
+
+
+@pytest.fixture
+def app(cache):
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/api/v2/leagues")
+    def leagues(n: int = 100):
+        app.state.calls += 1
+        return {"leagues": [f"league-{i}" for i in range(n)]}
+
+    @app.get("/api/v2/league/missing")
+    def missing():
+        app.state.calls += 1
+        raise HTTPException(status_code=404, detail="nope")
+
+    @app.get("/api/v2/players/stream")
+    def stream():
+        app.state.calls += 1
+        return NDJSONResponse({"i": i} for i in range(3))
+
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+
+def test_miss_then_hit_with_same_etag(client, app):
+    first = client.get("/api/v2/leagues", headers=IDENTITY)
+    second = client.get("/api/v2/leagues", headers=IDENTITY)
+
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.content == second.content
+    assert app.state.calls == 1
+    assert "Accept" in second.headers["vary"]
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get("/api/v2/leagues", headers=IDENTITY).headers["etag"]
+
+    for tag in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        r = client.get("/api/v2/leagues", headers={**IDENTITY, "If-None-Match": tag})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+
+    r = client.get("/api/v2/leagues", headers={**IDENTITY, "If-None-Match": '"stale"'})
+    assert r.status_code == 200
+
+
+def test_gzip_variant_has_its_own_etag(client):
+    plain = client.get("/api/v2/leagues", headers=IDENTITY)
+    zipped = client.get("/api/v2/leagues", headers={"Accept-Encoding": "gzip"})
+
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert zipped.content == plain.content  # httpx decodes the body
+
+    # the identity ETag does not validate the gzip variant
+    r = client.get("/api/v2/leagues", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]})
+    assert r.status_code == 200
+    r = client.get("/api/v2/leagues", headers={"Accept-Encoding": "gzip", "If-None-Match": zipped.headers["etag"]})
+    assert r.status_code == 304
+
+
+def test_query_order_shares_an_entry(client, app):
+    client.get("/api/v2/leagues?n=5&x=1", headers=IDENTITY)
+    r = client.get("/api/v2/leagues?x=1&n=5", headers=IDENTITY)
+    assert r.headers["x-cache"] == "HIT"
+    assert app.state.calls == 1
+
+
+def test_team_data_changed_clears_the_cache(client, app):
+    client.get("/api/v2/leagues", headers=IDENTITY)
+    events.publish(events.TEAM_DATA_CHANGED, {"league": "ENG-Premier League", "season": "2425", "teams": ["Arsenal"]})
+
+    r = client.get("/api/v2/leagues", headers=IDENTITY)
+    assert r.headers["x-cache"] == "MISS"
+    assert app.state.calls == 2
+
+
+def test_new_data_version_is_a_miss(client, cache, app):
+    client.get("/api/v2/leagues", headers=IDENTITY)
+    cache.test_version = "v2"
+
+    assert client.get("/api/v2/leagues", headers=IDENTITY).headers["x-cache"] == "MISS"
+    assert client.get("/api/v2/leagues", headers=IDENTITY).headers["x-cache"] == "HIT"
+    assert app.state.calls == 2
+
+
+def test_errors_are_not_cached(client, app):
+    for _ in range(2):
+        r = client.get("/api/v2/league/missing", headers=IDENTITY)
+        assert r.status_code == 404
+        assert "x-cache" not in r.headers
+    assert app.state.calls == 2
+
+
+def test_ndjson_requests_bypass_the_cache(client, app):
+    for _ in range(2):
+        r = client.get("/api/v2/players/stream", headers={**IDENTITY, "Accept": "application/x-ndjson"})
+        assert r.headers["content-type"] == "application/x-ndjson"
+        assert "x-cache" not in r.headers
+        assert r.content.splitlines() == [b'{"i":0}', b'{"i":1}', b'{"i":2}']
+    assert app.state.calls == 2
+
+
+def test_lru_eviction_stays_within_budget(cache):
+    cache.max_bytes, cache.max_entry_bytes = 3000, 1500
+    for i in range(5):
+        cache.put((f"/p{i}", "", "v1"), CachedResponse([], b"x" * 1000, f'"{i}"'))
+    stats = cache.stats()
+    assert stats["bytes"] <= 3000
+    assert stats["evictions"] == 2
+    assert cache.get(("/p1", "", "v1")) is None
+    assert cache.get(("/p2", "", "v1")) is not None
+    assert cache.get(("/p4", "", "v1")) is not None
+    assert not cache.put(("/big", "", "v1"), CachedResponse([], b"x" * 2000, '"big"'))
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip", 10) == "identity"  # too small to compress
+    assert negotiate_encoding("", 5000) == "identity"
+    assert negotiate_encoding("gzip", 5000) == "gzip"
+    assert negotiate_encoding("gzip;q=0", 5000) == "identity"
+    assert negotiate_encoding("*", 5000) in ("br", "gzip")
+    assert negotiate_encoding("br;q=0.1, gzip;q=0.9", 5000) == "gzip"
+
+
+def test_helpers():
+    assert normalized_query(b"b=2&a=1") == normalized_query(b"a=1&b=2") == "a=1&b=2"
+    assert etag_matches('W/"abc"', '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
@@ -0,0 +1,108 @@
+import math
+
+import numpy as np
+import orjson
+import pytest
+
+from utils.serialization_utils import (
+    ANY_SUBFIELD,
+    accepts_ndjson,
+    dumps,
+    iter_ndjson,
+    parse_fields,
+    project,
+)
+
+SCHEMA = {
+    "name": None,
+    "role": None,
+    "mental": {"m": None, "m_raw": None, "breakdown": None},
+    "stats": ANY_SUBFIELD,
+}
+PRESETS = {"card": ("name", "role", "mental.m"), "mental": ("name", "mental"), "full": None}
+
+
+def test_parse_fields_presets_and_paths():
+    assert parse_fields(None, PRESETS, SCHEMA) is None
+    assert parse_fields("", PRESETS, SCHEMA) is None
+    assert parse_fields("card", PRESETS, SCHEMA) == {"name": None, "role": None, "mental": {"m": None}}
+    assert parse_fields("name, stats.shooting.Gls", PRESETS, SCHEMA) == {
+        "name": None,
+        "stats": {"shooting": {"Gls": None}},
+    }
+
+
+def test_parse_fields_full_preset_disables_projection():
+    assert parse_fields("card,full", PRESETS, SCHEMA) is None
+
+
+def test_parse_fields_shorter_path_wins():
+    expected = {"name": None, "role": None, "mental": None}
+    assert parse_fields("card,mental", PRESETS, SCHEMA) == expected
+    assert parse_fields("mental,card", PRESETS, SCHEMA) == expected
+
+
+@pytest.mark.parametrize("fields", ["nmae", "mental.x", "name.first", "card,bogus"])
+def test_parse_fields_rejects_unknown_tokens(fields):
+    with pytest.raises(ValueError, match="Unknown field"):
+        parse_fields(fields, PRESETS, SCHEMA)
+
+
+def test_project_references_kept_subtrees():
+    player = {"name": "A", "role": "CB", "mental": {"m": 50.0, "m_raw": 0.1, "breakdown": {"x": 1}}, "stats": {}}
+    out = project(player, parse_fields("name,mental", PRESETS, SCHEMA))
+
+    assert out == {"name": "A", "mental": player["mental"]}
+    assert out["mental"] is player["mental"]
+
+
+def test_project_lists_and_missing_fields():
+    players = [{"name": "A", "mental": {"m": 1.0, "m_raw": 2.0}}, {"name": "B"}, "odd"]
+    tree = parse_fields("card", PRESETS, SCHEMA)
+
+    assert project(players, tree) == [{"name": "A", "mental": {"m": 1.0}}, {"name": "B"}, "odd"]
+    assert project(players, None) is players
+
+
+def test_iter_ndjson_lines_and_chunks():
+    items = [{"i": i, "v": math.nan if i == 3 else np.float64(i / 2)} for i in range(200)]
+    chunks = list(iter_ndjson(iter(items), chunk_bytes=256))
+
+    assert len(chunks) > 1
+    assert all(c.endswith(b"\n") for c in chunks)
+    lines = b"".join(chunks).splitlines()
+    assert [orjson.loads(line) for line in lines] == [
+        {"i": i, "v": None if i == 3 else i / 2} for i in range(200)
+    ]
+
+
+def test_iter_ndjson_is_lazy():
+    pulled = []
+
+    def items():
+        for i in range(10):
+            pulled.append(i)
+            yield {"i": i}
+
+    stream = iter_ndjson(items(), chunk_bytes=1)
+    assert next(stream) == b'{"i":0}\n'
+    assert pulled == [0]
+    assert list(iter_ndjson([])) == []
+
+
+def test_dumps_handles_sets_and_nan():
+    assert orjson.loads(dumps({"s": {1}, "n": math.inf, "a": np.array([1, 2])})) == {"s": [1], "n": None, "a": [1, 2]}
+
+
+@pytest.mark.parametrize(
+    "accept,expected",
+    [
+        ("application/x-ndjson", True),
+        ("Application/X-NDJSON; q=1, application/json", True),
+        ("application/json", False),
+        (None, False),
+        ("", False),
+    ],
+)
+def test_accepts_ndjson(accept, expected):
+    assert accepts_ndjson(accept) is expected
@@ -0,0 +1,86 @@
+from __future__ import annotations
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Cursor = Tuple[float, str]
+
+
+def player_id(player: dict) -> str:
+    """Stable tie-breaker for ordering: FBref id, else team:name."""
+    if player.get("fbref_id"):
+        return str(player["fbref_id"])
+    team = (player.get("__meta__") or {}).get("team") or player.get("team") or ""
+    return f"{team}:{player.get('name') or ''}"
+
+
+def parse_cursor(after: Optional[str]) -> Optional[Cursor]:
+    """'<score>,<id>' -> (score, id). Raises ValueError on a malformed cursor."""
+    if not after:
+        return None
+    score, sep, pid = after.partition(",")
+    if not sep or not pid:
+        raise ValueError("cursor must look like '<score>,<id>'")
+    return float(score), pid
+
+
+def format_cursor(score: float, pid: str) -> str:
+    return f"{float(score)!r},{pid}"
+
+
+def top_k_indices(
+    scores: np.ndarray,
+    ids: Sequence[str],
+    limit: Optional[int],
+    after: Optional[Cursor] = None,
+) -> Tuple[np.ndarray, Optional[str]]:
+    """
+    Indexes of the next `limit` entries ordered by score desc, id asc, strictly after `after`.
+    NaN scores are skipped. Selection is argpartition (O(n)) + a sort of the k picked,
+    so a deep page costs the same as the first. Returns (indexes, next cursor or None).
+    """
+    scores = np.asarray(scores, dtype=float)
+    ids_arr = np.asarray(ids, dtype=object)
+
+    mask = ~np.isnan(scores)
+    if after is not None:
+        a_score, a_id = after
+        mask &= (scores < a_score) | ((scores == a_score) & (ids_arr > a_id))
+    candidates = np.flatnonzero(mask)
+    has_more = limit is not None and len(candidates) > limit
+
+    if has_more:
+        # Partition on score; entries tied with the k-th score all stay in play for the id tie-break.
+        kth = np.partition(-scores[candidates], limit - 1)[limit - 1]
+        candidates = candidates[-scores[candidates] <= kth]
+
+    order = candidates[np.lexsort((ids_arr[candidates], -scores[candidates]))]
+    next_cursor = None
+    if has_more:
+        order = order[:limit]
+        next_cursor = format_cursor(scores[order[-1]], ids_arr[order[-1]])
+    return order, next_cursor
+
+
+def normalized_scores(scores: np.ndarray) -> np.ndarray:
+    """0-100 min-max scaling over finite scores (50 when all equal); NaN stays NaN."""
+    scores = np.asarray(scores, dtype=float)
+    finite = np.isfinite(scores)
+    if not finite.any():
+        return np.full_like(scores, np.nan)
+    lo, hi = scores[finite].min(), scores[finite].max()
+    if hi == lo:
+        return np.where(finite, 50.0, np.nan)
+    return np.where(finite, (scores - lo) / (hi - lo) * 100.0, np.nan)
+
+
+def score_array(players: List[dict], path: Sequence[str]) -> np.ndarray:
+    """Pull a nested numeric field (e.g. ("ranking", "performance")) into a float array; missing -> NaN."""
+    out = np.full(len(players), np.nan)
+    for i, p in enumerate(players):
+        v = p
+        for key in path:
+            v = v.get(key) if isinstance(v, dict) else None
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[i] = v
+    return out
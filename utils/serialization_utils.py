@@ -0,0 +1,132 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# numpy arrays/scalars natively, non-str dict keys stringified; NaN/inf always encode as null
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for what orjson can't encode itself (pandas objects/NA, sets, odd numpy types)."""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if hasattr(obj, "item"):
+        return obj.item()
+    if obj.__class__.__name__ in ("NAType", "NaTType"):
+        return None
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """One pass over obj straight to UTF-8 JSON bytes; no sanitized copy of the tree."""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson: NaN/inf -> null, numpy scalars and arrays encoded natively."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+def accepts_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept.lower()
+
+
+def iter_ndjson(items: Iterable[Any], chunk_bytes: int = NDJSON_CHUNK_BYTES) -> Iterator[bytes]:
+    """One JSON document per line, lines grouped into ~chunk_bytes writes; items are pulled only as chunks go out."""
+    option = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+    buf, size = [], 0
+    for item in items:
+        line = orjson.dumps(item, default=_default, option=option)
+        buf.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    Streams items as NDJSON. The item iterator is advanced in the threadpool one chunk
+    at a time and each chunk waits on the client's send, so memory holds one chunk and
+    a slow reader slows the producer instead of queueing the whole result.
+    """
+
+    def __init__(self, items: Iterable[Any], status_code: int = 200, headers: Optional[Dict[str, str]] = None):
+        super().__init__(iter_ndjson(items), status_code=status_code, headers=headers, media_type=NDJSON_MEDIA_TYPE)
+
+
+Projection = Dict[str, Any]  # key -> nested Projection, or None to keep the value whole
+Presets = Dict[str, Optional[Tuple[str, ...]]]  # preset name -> dot paths; None means the whole object
+ANY_SUBFIELD = "*"  # schema value: any path below this key is accepted (e.g. dynamic stats groups)
+
+
+def _check_path(parts: List[str], schema: Dict[str, Any]) -> bool:
+    """Schema: key -> None (leaf), nested schema, or ANY_SUBFIELD."""
+    node: Any = schema
+    for part in parts:
+        if node == ANY_SUBFIELD:
+            return True
+        if not isinstance(node, dict) or part not in node:
+            return False
+        node = node[part]
+    return True
+
+
+def parse_fields(fields: Optional[str], presets: Presets, schema: Dict[str, Any]) -> Optional[Projection]:
+    """
+    Comma-separated presets and/or dot paths ("card,stats.shooting") -> projection tree.
+    None (no projection) for an empty value or when a preset maps to None ("full").
+    Raises ValueError for a token that is neither a preset nor a path allowed by schema.
+    """
+    if not fields:
+        return None
+    tree: Projection = {}
+    for token in fields.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        if token in presets:
+            paths = presets[token]
+            if paths is None:
+                return None
+        elif _check_path(token.split("."), schema):
+            paths = (token,)
+        else:
+            raise ValueError(f"Unknown field '{token}'; use a preset ({', '.join(presets)}) or a dot path")
+        for path in paths:
+            parts = path.split(".")
+            node = tree
+            for part in parts[:-1]:
+                child = node.get(part, {})
+                if child is None:  # a shorter path already keeps this subtree whole
+                    break
+                node = node.setdefault(part, child)
+            else:
+                node[parts[-1]] = None
+    return tree
+
+
+def project(obj: Any, tree: Optional[Projection]) -> Any:
+    """Keep only the fields in tree; kept subtrees are referenced, not copied. Missing fields are skipped."""
+    if tree is None:
+        return obj
+    if isinstance(obj, list):
+        return [project(item, tree) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    out = {}
+    for key, sub in tree.items():
+        if key in obj:
+            out[key] = obj[key] if sub is None else project(obj[key], sub)
+    return out